@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+"""
+Solves many DIMACS files with a pool of processes
+
+The files are given as files, directories (searched recursively)
+or globs, and are solved largest first. Each instance runs in its own
+process, with optional time and memory limits, and its result is
+written as a JSON line as soon as it is known:
+
+    {"file": ..., "status": "SAT" | "UNSAT" | "TIMEOUT" | "MEMOUT" | "ERROR",
+     "parse_time": ..., "solve_time": ..., "max_rss": ..., "stats": {...}}
+
+max_rss is the peak resident memory of the worker in KB.
+
+With --resume, the files already in the output file are skipped.
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import signal
+import sys
+import traceback
+from multiprocessing.connection import wait
+from time import time
+
+from .parsers.DIMACS import parse_cnf, openers
+from .preprocess import PASSES
+from .utils.restarts import policies as restart_policies
+
+EXTENSIONS = tuple('.cnf' + ext for ext in ('',) + tuple(openers))
+
+# seconds given to a worker after its time limit
+# to report its result before it is killed
+GRACE = 1.
+
+
+class Timeout(Exception):
+    pass
+
+
+def find(patterns):
+    """
+    returns the DIMACS files of the patterns (files, directories or globs)
+    """
+    files = set()
+    for pattern in patterns:
+        for path in glob.glob(pattern, recursive=True) or [pattern]:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.update(os.path.join(root, name) for name in names
+                                 if name.endswith(EXTENSIONS))
+            elif os.path.isfile(path):
+                files.add(path)
+    return files
+
+
+def done(output):
+    """
+    files of the results of an output file
+    """
+    ans = set()
+    if not os.path.exists(output):
+        return ans
+    with open(output) as f:
+        for line in f:
+            try:
+                ans.add(json.loads(line)['file'])
+            except (ValueError, KeyError):
+                # truncated last line of an interrupted sweep
+                pass
+    return ans
+
+
+def alarm(signum, frame):
+    raise Timeout
+
+
+def run(path, config, timeout, memory, conn):
+    """
+    solves path in a worker and sends its result line to conn
+    """
+    if memory:
+        limit = memory << 20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if timeout:
+        signal.signal(signal.SIGALRM, alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    line = {'file': path}
+    solver = None
+    dbt = time()
+    try:
+        solver = parse_cnf(path, **config)
+        line['parse_time'] = time() - dbt
+        dbt = time()
+        line['status'] = 'UNSAT' if solver.solve() is False else 'SAT'
+    except Timeout:
+        line['status'] = 'TIMEOUT'
+    except MemoryError:
+        line['status'] = 'MEMOUT'
+    except Exception:
+        line['status'] = 'ERROR'
+        line['error'] = traceback.format_exc()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    if 'parse_time' in line:
+        line['solve_time'] = time() - dbt
+    line['max_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    line['stats'] = dict(solver.stats) if solver is not None else {}
+    # the memory of the solver is needed to send the result
+    del solver
+    conn.send(line)
+    conn.close()
+
+
+def batch(files, out, jobs=1, timeout=None, memory=None, **config):
+    """
+    solves the files with jobs processes, largest first,
+    and writes their results as JSON lines to the file object out
+
+    timeout is in seconds and memory in MB (per instance),
+    config is passed to the Solver
+    """
+    context = multiprocessing.get_context()
+    # popped from the end
+    todo = sorted(files, key=lambda path: (os.path.getsize(path), path))
+    # reader -> (process, path, start)
+    running = {}
+    while todo or running:
+        while todo and len(running) < jobs:
+            path = todo.pop()
+            reader, writer = context.Pipe(duplex=False)
+            process = context.Process(
+                target=run, daemon=True,
+                args=(path, config, timeout, memory, writer))
+            process.start()
+            writer.close()
+            running[reader] = process, path, time()
+        wait(list(running), GRACE / 10)
+        for reader, (process, path, start) in list(running.items()):
+            if reader.poll():
+                try:
+                    line = reader.recv()
+                except EOFError:
+                    process.join()
+                    line = {'file': path, 'status': 'ERROR',
+                            'error': 'exit code %s' % process.exitcode}
+            elif timeout and time() - start > timeout + GRACE:
+                process.kill()
+                line = {'file': path, 'status': 'TIMEOUT'}
+            else:
+                continue
+            process.join()
+            reader.close()
+            del running[reader]
+            out.write(json.dumps(line) + '\n')
+            out.flush()
+
+
+parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+parser.add_argument('paths', nargs='+',
+                    help='DIMACS files, directories or globs')
+parser.add_argument('-o', '--output', default=None,
+                    help='JSON lines output (default: standard output)')
+parser.add_argument('--resume', action='store_true',
+                    help='skip the files already in the output')
+parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                    help='number of processes')
+parser.add_argument('--timeout', type=float, default=None,
+                    help='time limit per instance (seconds)')
+parser.add_argument('--memory', type=int, default=None,
+                    help='memory limit per instance (MB)')
+parser.add_argument('--bcp', choices=['2wl', 'counting'], default='2wl',
+                    help='clausal propagation engine')
+parser.add_argument('--restarts', choices=sorted(restart_policies),
+                    default='luby', help='restart policy')
+parser.add_argument('--preprocess', default=','.join(PASSES),
+                    help='comma separated preprocessing passes among %s '
+                    '(empty to disable)' % ', '.join(PASSES))
+parser.add_argument('--cache', default=None,
+                    help='directory of a cache of learned clauses')
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    files = find(args.paths)
+    if args.resume:
+        if args.output is None:
+            parser.error('--resume needs --output')
+        files -= done(args.output)
+    config = dict(bcp=args.bcp, restarts=args.restarts,
+                  preprocess=tuple(filter(None, args.preprocess.split(','))),
+                  cache=args.cache)
+    if args.output is None:
+        batch(files, sys.stdout, args.jobs, args.timeout, args.memory,
+              **config)
+        return
+    with open(args.output, 'a' if args.resume else 'w') as out:
+        if out.tell():
+            # the last line may have been truncated
+            with open(args.output, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read() != b'\n':
+                    out.write('\n')
+        batch(files, out, args.jobs, args.timeout, args.memory, **config)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark suite
+
+Solves the bundled instances (tests/cnf) and generated ones
+(see utils.generators) one at a time, each in a new process
+(see batch), and reports the conflicts, propagations and decisions
+per second, the peak RSS and the wall time of each of them.
+
+    python3 -m mcSATan.bench --save baseline.json
+    python3 -m mcSATan.bench --compare baseline.json --threshold .2
+
+With --proof, the instances are solved with a DRAT proof,
+to measure its overhead against a baseline without.
+
+The comparison fails (exit code 1) if an instance changes answer,
+or if its wall time or its peak RSS is more than threshold
+above the baseline. The instances faster than min_time
+in the baseline are too noisy to be compared on time.
+"""
+
+import argparse
+import io
+import json
+import sys
+import tempfile
+from fnmatch import fnmatch
+from pathlib import Path
+
+from . import batch
+from .utils import generators
+
+BUNDLED = Path(__file__).parent.parent / 'tests' / 'cnf'
+
+SUITE = {
+    'pigeonhole-8-7': lambda: generators.pigeonhole(8, 7),
+    'random-3sat-150-0': lambda: generators.random_ksat(150, 3, seed=0),
+    'random-3sat-150-1': lambda: generators.random_ksat(150, 3, seed=1),
+    'random-3sat-150-2': lambda: generators.random_ksat(150, 3, seed=2),
+    'random-4sat-60-0': lambda: generators.random_ksat(60, 4, seed=0),
+    'parity-10': lambda: generators.parity(10),
+    'parity-11': lambda: generators.parity(11),
+    'coloring-60-250-4': lambda: generators.coloring(60, 250, 4, seed=0),
+    'coloring-80-300-4': lambda: generators.coloring(80, 300, 4, seed=3),
+}
+
+
+def instances(directory, pattern='*'):
+    """
+    returns name -> path of the instances whose name matches pattern,
+    the generated ones are written in directory
+    """
+    files = {}
+    if BUNDLED.is_dir():
+        for path in sorted(BUNDLED.glob('*.cnf')):
+            files['cnf/' + path.stem] = str(path)
+    for name, generator in SUITE.items():
+        path = Path(directory) / (name + '.cnf')
+        path.write_text(generators.dimacs(*generator()))
+        files[name] = str(path)
+    return {name: path for name, path in files.items()
+            if fnmatch(name, pattern)}
+
+
+def measure(line):
+    """
+    metrics of a result line of batch
+    """
+    stats = line.get('stats', {})
+    solve_time = max(line.get('solve_time', 0), 1e-9)
+    return {
+        'status': line['status'],
+        'wall_time': line.get('parse_time', 0) + line.get('solve_time', 0),
+        'conflicts_per_s': stats.get('nb_conflicts', 0) / solve_time,
+        'propagations_per_s':
+            stats.get('nb_clausal_propagations', 0) / solve_time,
+        'decisions_per_s': stats.get('nb_decisions', 0) / solve_time,
+        'max_rss': line.get('max_rss', 0),
+    }
+
+
+def run(files, timeout=None, **config):
+    """
+    returns name -> metrics of the instances files (name -> path)
+    """
+    names = {path: name for name, path in files.items()}
+    out = io.StringIO()
+    batch.batch(files.values(), out, 1, timeout, **config)
+    return {names[line['file']]: measure(line)
+            for line in map(json.loads, out.getvalue().splitlines())}
+
+
+def compare(results, baseline, threshold=.2, min_time=.1):
+    """
+    returns the regressions of results from baseline (as messages)
+    """
+    regressions = []
+    for name, new in sorted(results.items()):
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if new['status'] != old['status']:
+            regressions.append('%s: %s instead of %s'
+                               % (name, new['status'], old['status']))
+        if (old['wall_time'] >= min_time and
+                new['wall_time'] > old['wall_time'] * (1 + threshold)):
+            regressions.append('%s: wall time %.2fs instead of %.2fs'
+                               % (name, new['wall_time'], old['wall_time']))
+        if new['max_rss'] > old['max_rss'] * (1 + threshold):
+            regressions.append('%s: peak RSS %sKB instead of %sKB'
+                               % (name, new['max_rss'], old['max_rss']))
+    return regressions
+
+
+def report(results, out=sys.stdout):
+    print('%-20s %-8s %9s %12s %14s %12s %10s' % (
+        'instance', 'status', 'wall (s)', 'conflicts/s', 'propagations/s',
+        'decisions/s', 'RSS (KB)'), file=out)
+    for name, metrics in sorted(results.items()):
+        print('%-20s %-8s %9.2f %12.0f %14.0f %12.0f %10d' % (
+            name, metrics['status'], metrics['wall_time'],
+            metrics['conflicts_per_s'], metrics['propagations_per_s'],
+            metrics['decisions_per_s'], metrics['max_rss']), file=out)
+
+
+parser = argparse.ArgumentParser(description='Benchmark suite')
+parser.add_argument('--only', default='*',
+                    help='glob of the instance names (for instance "cnf/*")')
+parser.add_argument('--timeout', type=float, default=300,
+                    help='time limit per instance (seconds)')
+parser.add_argument('--proof', action='store_true',
+                    help='writes DRAT proofs (to measure their overhead)')
+parser.add_argument('--save', default=None,
+                    help='saves the results as a JSON baseline')
+parser.add_argument('--compare', default=None,
+                    help='JSON baseline to compare with')
+parser.add_argument('--threshold', type=float, default=.2,
+                    help='relative slowdown that is a regression')
+parser.add_argument('--min-time', type=float, default=.1,
+                    help='minimum wall time (in the baseline) '
+                    'to compare the times')
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as directory:
+        config = {}
+        if args.proof:
+            config['proof'] = str(Path(directory) / 'proof.drat')
+        results = run(instances(directory, args.only), args.timeout,
+                      **config)
+    report(results)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold,
+                              args.min_time)
+        for regression in regressions:
+            print('REGRESSION', regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
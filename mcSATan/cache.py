@@ -0,0 +1,175 @@
+"""
+On-disk cache of learned clauses
+
+A Solver created with cache=directory (or a ClauseCache) stores at the
+end of each solve its short learned clauses with a low LBD, its level 0
+assignments and its saved phases, under the fingerprint of its original
+clauses. The first solve of a formula that contains all the clauses of
+a cached one (with the same numbering of the variables) preloads them.
+
+The fingerprint of a formula is the sorted array of the 64-bit hashes
+of its clauses (see fingerprints), its key the hash of that array.
+An entry is a checkpoint file (see checkpoint) with a checksum of
+its arrays: a corrupted entry is deleted. A stale entry (for instance
+after a hash collision) cannot make an answer unsound: the Solver only
+adds the cached clauses that it derives by unit propagation
+(see Solver.load_cache).
+
+The least recently used entries are deleted when the cache
+is larger than max_bytes.
+"""
+
+import os
+import struct
+from array import array
+from hashlib import blake2b
+
+from .checkpoint import read, write
+
+SUFFIX = '.clauses'
+
+
+def fingerprints(lits, offsets):
+    """
+    sorted array of the hashes of the clauses lits[offsets[i]:offsets[i + 1]]
+    (their literals are sorted and deduplicated)
+    """
+    ans = array('Q')
+    start = offsets[0]
+    for end in offsets[1:]:
+        clause = array('i', sorted(set(lits[start:end])))
+        ans.append(int.from_bytes(blake2b(clause.tobytes(),
+                                          digest_size=8).digest(), 'little'))
+        start = end
+    return array('Q', sorted(ans))
+
+
+def checksum(arrays):
+    digest = blake2b(digest_size=16)
+    for name in sorted(arrays):
+        digest.update(name.encode())
+        digest.update(arrays[name].tobytes())
+    return digest.hexdigest()
+
+
+class ClauseCache():
+    """
+    Directory of cached clauses
+
+    The learned clauses of length at most max_length
+    and of LBD at most max_lbd are stored.
+    """
+
+    def __init__(self, directory, max_bytes=64 << 20, max_length=8,
+                 max_lbd=4):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_length = max_length
+        self.max_lbd = max_lbd
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def entries(self):
+        """
+        paths of the entries, the least recently used first
+        """
+        paths = [os.path.join(self.directory, name)
+                 for name in os.listdir(self.directory)
+                 if name.endswith(SUFFIX)]
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                # deleted by another solver
+                pass
+        return sorted(mtimes, key=mtimes.get)
+
+    def read(self, path, names=None):
+        """
+        header and arrays (only those of names if it is not None)
+        of an entry, None if it is missing or corrupted (and then deleted)
+
+        the checksum is only checked if all the arrays are read
+        """
+        try:
+            header, arrays = read(path, names)
+            if names is None and header['checksum'] != checksum(arrays):
+                raise ValueError('wrong checksum')
+            return header, arrays
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, OSError, struct.error):
+            self.discard(path)
+            return None
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def lookup(self, prints):
+        """
+        returns the arrays of the entry of the formula of fingerprints
+        prints, or else of the largest cached formula it contains,
+        None if there is none
+
+        only the headers of the other entries are read,
+        then the fingerprints of the largest ones first
+        """
+        key = blake2b(prints.tobytes(), digest_size=16).hexdigest()
+        path = self.path(key)
+        entry = self.read(path)
+        if entry is None:
+            sizes = {}
+            for other in self.entries():
+                entry = self.read(other, ())
+                if entry is not None and (entry[0]['nb_clauses'] <=
+                                          len(prints)):
+                    sizes[other] = entry[0]['nb_clauses']
+            present = set(prints)
+            entry = None
+            for other in sorted(sizes, key=sizes.get, reverse=True):
+                found = self.read(other, ('fingerprints',))
+                if found is None or not present.issuperset(
+                        found[1]['fingerprints']):
+                    continue
+                entry = self.read(other)
+                if entry is not None:
+                    path = other
+                    break
+        if entry is None:
+            return None
+        # most recently used
+        os.utime(path)
+        return entry[1]
+
+    def store(self, prints, clauses, phase):
+        """
+        stores the clauses (array of length, LBD, literals...)
+        and the phases of the formula of fingerprints prints,
+        then deletes the least recently used entries
+        """
+        key = blake2b(prints.tobytes(), digest_size=16).hexdigest()
+        arrays = dict(fingerprints=prints, clauses=clauses,
+                      phase=array('B', phase))
+        write(self.path(key), dict(nb_clauses=len(prints),
+                                   checksum=checksum(arrays)), arrays)
+        paths = self.entries()
+        sizes = {}
+        for path in paths:
+            try:
+                sizes[path] = os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        total = sum(sizes.values())
+        # the new entry is kept
+        for path in paths[:-1]:
+            if total <= self.max_bytes:
+                break
+            if path in sizes and path != self.path(key):
+                self.discard(path)
+                total -= sizes[path]
@@ -0,0 +1,82 @@
+"""
+Checkpoint files of a Solver
+
+A checkpoint (see Solver.checkpoint and Solver.resume) is MAGIC,
+the length of a JSON header (little endian uint64), the header,
+then raw arrays, each of them aligned on ALIGN bytes,
+so that they can be mapped in memory (memoryview.cast, numpy.memmap).
+
+The header has the scalars (configuration, stats...) and
+header['arrays'] maps the name of each array to its typecode,
+its offset in the file and its length.
+The arrays are in the byte order header['byteorder'].
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b'mcSATan checkpoint 1\n'
+LENGTH = struct.Struct('<Q')
+ALIGN = 8
+
+
+def write(path, header, arrays):
+    """
+    writes the dict header and the arrays (name -> array) to path
+
+    the file is written next to path then renamed,
+    so that path is always a complete checkpoint
+    """
+    offset = len(MAGIC) + LENGTH.size
+    index = {}
+    # the offsets depend on the length of the header, which
+    # depends on the offsets: they are computed from a bound of it
+    bound = len(json.dumps(dict(header, arrays={
+        name: [data.typecode, 1 << 62, 1 << 62] for name, data in
+        arrays.items()}, byteorder=sys.byteorder)).encode())
+    start = -(-(offset + bound) // ALIGN) * ALIGN
+    for name, data in arrays.items():
+        index[name] = [data.typecode, start, len(data)]
+        start += -(-len(data) * data.itemsize // ALIGN) * ALIGN
+    text = json.dumps(dict(header, arrays=index,
+                           byteorder=sys.byteorder)).encode()
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(LENGTH.pack(len(text)))
+        f.write(text)
+        for name, data in arrays.items():
+            f.write(bytes(index[name][1] - f.tell()))
+            f.write(data.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read(path, names=None):
+    """
+    returns the header and the arrays (name -> array) of a checkpoint,
+    only those of names if it is not None
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0,
+                                          access=mmap.ACCESS_READ) as data:
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError('%s is not a checkpoint' % path)
+        start = len(MAGIC) + LENGTH.size
+        length, = LENGTH.unpack(data[len(MAGIC):start])
+        header = json.loads(data[start:start + length].decode())
+        arrays = {}
+        with memoryview(data) as view:
+            for name, (typecode, offset, size) in header['arrays'].items():
+                if names is not None and name not in names:
+                    continue
+                arrays[name] = values = array(typecode)
+                values.frombytes(view[offset:offset +
+                                      size * values.itemsize])
+                if header['byteorder'] != sys.byteorder:
+                    values.byteswap()
+    return header, arrays
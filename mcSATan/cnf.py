@@ -6,59 +6,164 @@ A DIMACS SAT-Solver based on mcSAT
 """
 
 import argparse
+import os
 from time import time
 from sys import stderr, stdin, path
+from tempfile import NamedTemporaryFile
 from pprint import pprint
 
 from mcSATan.core import Solver
 from mcSATan.logger import logger
-
-
-def parse(infile):
-    solver = Solver(CDCL=True)
-    buf = []
-    nClauses = float('inf')
-    for line in args.infile:
-        if not nClauses:
-            break
-        line = line.split()
-        if line[0] == 'c':
-            continue
-        if line[0] == 'p':
-            assert line[1] == 'cnf'
-            nVar = int(line[2])
-            nClauses = int(line[3])
-            variables = {i: solver.BoolVar('var%s' % i)
-                         for i in range(1, nVar + 1)}
-            continue
-        *line, = map(int, line)
-        line = buf + line
-        buf = []
-        if line[-1] != 0:
-            buf = line
-            continue
-        nClauses -= 1
-        solver.Clause(*[solver.Literal(variables[abs(i)], i > 0)
-                        for i in line[:-1]])
-    return solver
-
+from mcSATan.utils.restarts import policies as restart_policies
+from mcSATan.parsers.DIMACS import parse_cnf
+from mcSATan.preprocess import PASSES
+from mcSATan.proof import Proof
+from mcSATan import portfolio, cube
 
 parser = argparse.ArgumentParser()
-parser.add_argument('infile', nargs='?', type=argparse.FileType('r'),
-                    default=stdin)
+parser.add_argument('infile', nargs='?', default='-',
+                    help='DIMACS file, possibly compressed '
+                    '(.gz, .bz2 or .xz)')
 parser.add_argument('--debug', nargs='?', type=int, default=30)
+parser.add_argument('--bcp', choices=['2wl', 'counting'], default='2wl',
+                    help='clausal propagation engine')
+parser.add_argument('--branching', choices=['vsids', 'static'],
+                    default='vsids', help='variable order')
+parser.add_argument('--restarts', choices=sorted(restart_policies),
+                    default='luby', help='restart policy')
+parser.add_argument('--reduce', choices=['lbd', 'activity', 'none'],
+                    default='lbd', help='learned clauses forget policy')
+parser.add_argument('--max-learned', type=int, default=None,
+                    help='maximum number of learned clauses')
+parser.add_argument('--preprocess', default=','.join(PASSES),
+                    help='comma separated preprocessing passes among %s '
+                    '(empty to disable)' % ', '.join(PASSES))
+parser.add_argument('--progress', type=int, default=0,
+                    help='prints a progress line every N conflicts')
+parser.add_argument('--trace', default=None,
+                    help='writes the events of the search to this file '
+                    '(see python3 -m mcSATan.trace)')
+parser.add_argument('--proof', default=None,
+                    help='writes a DRAT proof of unsatisfiability '
+                    'to this file')
+parser.add_argument('--lrat', action='store_true',
+                    help='LRAT proof (disables the preprocessing)')
+parser.add_argument('--text-proof', action='store_true',
+                    help='text proof instead of binary')
+parser.add_argument('--checkpoint', default=None,
+                    help='saves the state of the solver to this file '
+                    'every --checkpoint-every conflicts')
+parser.add_argument('--checkpoint-every', type=int, default=10000,
+                    help='conflicts between two checkpoints')
+parser.add_argument('--resume', action='store_true',
+                    help='resumes from --checkpoint if it exists')
+parser.add_argument('--cache', default=None,
+                    help='directory of a cache of learned clauses, '
+                    'shared by the runs on the same formula')
+parser.add_argument('--conflicts', type=int, default=None,
+                    help='budget of conflicts (UNKNOWN when it is exhausted)')
+parser.add_argument('--propagations', type=int, default=None,
+                    help='budget of clausal propagations')
+parser.add_argument('--decisions', type=int, default=None,
+                    help='budget of decisions')
+parser.add_argument('--time', type=float, default=None,
+                    help='budget of time of the search (seconds)')
+parser.add_argument('--jobs', type=int, default=1,
+                    help='number of solvers of the portfolio')
+parser.add_argument('--cube', action='store_true',
+                    help='cube-and-conquer with --jobs processes')
+parser.add_argument('--cube-depth', type=int, default=None,
+                    help='number of split variables of a cube')
 
 
-if __name__ == '__main__':
-
+def main():
+    """
+    entry point of python3 -m mcSATan.cnf and of bin/cnf.py
+    """
     args = parser.parse_args()
     logger.setLevel(args.debug)
 
+    config = dict(bcp=args.bcp, branching=args.branching,
+                  restarts=args.restarts,
+                  reduce=None if args.reduce == 'none' else args.reduce,
+                  max_learned=args.max_learned, progress=args.progress,
+                  trace=args.trace, cache=args.cache,
+                  preprocess=tuple(filter(None, args.preprocess.split(','))))
+
+    if args.jobs > 1 or args.cube:
+        if (args.conflicts, args.propagations, args.decisions,
+                args.time) != (None,) * 4:
+            parser.error('the budgets need a single solver')
+        if args.trace is not None or args.cache is not None:
+            parser.error('--trace and --cache need a single solver')
+
+    if args.checkpoint is not None:
+        if args.jobs > 1 or args.cube:
+            parser.error('--checkpoint needs a single solver')
+        config.update(checkpoint_path=args.checkpoint,
+                      checkpoint_every=args.checkpoint_every)
+    elif args.resume:
+        parser.error('--resume needs --checkpoint')
+
+    if args.proof is not None:
+        if args.resume:
+            parser.error('a resumed solver cannot write a proof')
+        if args.jobs > 1 or args.cube:
+            parser.error('--proof needs a single solver')
+        if args.lrat:
+            if args.cache is not None:
+                parser.error('--lrat cannot use --cache')
+            config['preprocess'] = ()
+        config['proof'] = Proof(args.proof, lrat=args.lrat,
+                                binary=not args.text_proof)
+
+    if args.jobs > 1 or args.cube:
+        dbt = time()
+        if args.cube:
+            def run(path):
+                return cube.solve(path, args.jobs, args.cube_depth, **config)
+        else:
+            def run(path):
+                return portfolio.solve(path, args.jobs, **config)[:2]
+        if args.infile == '-':
+            # the workers read the formula from a file
+            with NamedTemporaryFile(suffix='.cnf') as f:
+                f.write(stdin.buffer.read())
+                f.flush()
+                model, stats = run(f.name)
+        else:
+            model, stats = run(args.infile)
+        print('SAT' if model else 'UNSAT')
+        pprint(dict(stats))
+        print('Solved %.02fs' % (time() - dbt), file=stderr)
+        return
+
     dbt = time()
-    solver = parse(args.infile)
-    print('Parsed %.02fs' % (time() - dbt), file=stderr)
+    if args.resume and os.path.exists(args.checkpoint):
+        solver = Solver.resume(args.checkpoint, progress=args.progress,
+                               trace=args.trace)
+        print('Resumed %.02fs at %s conflicts' % (
+            time() - dbt, solver.stats.nb_conflicts), file=stderr)
+    else:
+        solver = parse_cnf(args.infile, **config)
+        print('Parsed %.02fs (%.02f MB/s)' % (
+            time() - dbt, solver.stats.parse_bytes / 1e6 /
+            max(solver.stats.parse_time, 1e-9)), file=stderr)
 
     dbt = time()
-    solver.solve()
-    pprint(solver.stats)
+    model = solver.solve(conflicts=args.conflicts,
+                         propagations=args.propagations,
+                         decisions=args.decisions, time=args.time)
+    if model is None:
+        print('UNKNOWN (%s)' % solver.stopped)
+    else:
+        print('SAT' if model else 'UNSAT')
+    pprint(dict(solver.stats))
     print('Solved %.02fs' % (time() - dbt), file=stderr)
+    solver.close()
+    if args.proof is not None:
+        solver.proof.close()
+
+
+if __name__ == '__main__':
+    main()
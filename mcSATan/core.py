@@ -1,13 +1,25 @@
-from collections import defaultdict
+import sys
+from array import array
+from time import perf_counter
 
 from . import types
-from . import logger
+from .utils.restarts import policies as restart_policies
+from .preprocess import Preprocessor, PASSES
+from .proof import Proof, lrat_hints
+from .csr import ClauseMatrix
+from .cache import ClauseCache, fingerprints
+from .checkpoint import read as read_checkpoint, write as write_checkpoint
+from .types.clauses import LEARNED
+from .watches import HEADER, FLAGS, LBD, ACTIVITY
 
 """
 TODO: put values as a field in variable class without name
 retrieve the variable from VarDB
 """
 
+# answer of Solver.solve when the search is stopped (see Solver.stopped)
+UNKNOWN = None
+
 
 class Conflict(Exception):
 
@@ -21,200 +33,590 @@ class Conflict(Exception):
 class Trail():
     """
     Stores the values of atoms with levels
+
+    Variables are their indices in the VarDB
+    and literals are their codes (see Literal.code).
+    The values of the Bool variables are those of
+    the ClauseDB, the other ones are stored in the Var.
+
+    The reason of a clausal propagation is the reference
+    of the clause in the ClauseDB, the other reasons
+    are negative constants.
+
+    The assignments are pushed on a single stack
+    (the literal code 2 * var for non Bool variables),
+    lim[l] is the start of the level l + 1 in the stack
+    and head is the first assignment not yet propagated.
+    Backtracking truncates the stack.
     """
 
-    def __init__(self, variables, clauses, stats):
+    DECISION = -1
+    SEMANTIC = -2
+
+    def __init__(self, variables, clauses, stats, minimize=True):
         self.stats = stats
         self.variables = variables
         self.clauses = clauses
+        # minimization of the learned clauses
+        self.minimize = minimize
 
-        self.reason = {}
-        self.lvl = {}
+        # var -> reason
+        self.reason = array('i')
+        # var -> level (-1 if unassigned)
+        self.lvl = array('i')
         self.level = 0
-        self.at_lvl = defaultdict(list)
+        # var -> 1 during the conflict analysis
+        self.seen = bytearray()
+        # assignment stack
+        self.stack = array('i')
+        self.lim = array('i')
+        self.head = 0
+
+    def add_var(self, var):
+        """
+        registers var in the VarDB and returns its index
+        """
+        index = self.variables.add(var)
+        self.reason.append(self.DECISION)
+        self.lvl.append(-1)
+        self.seen.append(0)
+        if var.type == 'Bool':
+            self.clauses.add_var()
+        return index
 
     def set_value(self, var, val, reason, lvl):
-        self.variables.assign(var, val)
+        self.variables.assign(var)
         self.reason[var] = reason
         self.lvl[var] = lvl
-        self.at_lvl[lvl].append(var)
-        if var.type == 'Bool':
+        if self.variables.is_bool[var]:
+            self.stack.append(2 * var + (not val))
             self.clauses.assign_atom(var, val)
+        else:
+            self.stack.append(2 * var)
+            self.variables.by_index[var].value = val
 
-    def del_values_at_lvl(self, lvl):
-        if lvl not in self.at_lvl:
+    def backtrack(self, lvl):
+        """
+        unassigns everything above lvl
+        """
+        if lvl >= self.level:
             return
-        for var in self.at_lvl[lvl]:
-            del self.reason[var]
-            del self.lvl[var]
+        start = self.lim[lvl]
+        is_bool = self.variables.is_bool
+        phase = self.variables.phase
+        for lit in self.stack[start:]:
+            var = lit >> 1
+            self.reason[var] = self.DECISION
+            self.lvl[var] = -1
             self.variables.desassign(var)
-            if var.type == 'Bool':
+            if is_bool[var]:
+                # phase saving
+                phase[var] = not lit & 1
                 self.clauses.desassign_atom(var)
-        del self.at_lvl[lvl]
+            else:
+                self.variables.by_index[var].value = None
+        self.variables.update_phases(self.stack)
+        del self.stack[start:]
+        del self.lim[lvl:]
+        self.level = lvl
+        self.head = min(self.head, start)
 
     def has_value(self, var):
-        return var.value is not None
+        return self.lvl[var] >= 0
 
     def decide(self, var, val):
-        logger.debug(
-            'decide\n'
-            '\tvar: %s\n'
-            '\tvalue: %s\n', var, val)
-        assert var.value is None
+        self.lim.append(len(self.stack))
         self.level += 1
         # no need to remove the variable
         # we assume it has already been popped
         # from the VarDB
-        self.set_value(var, val, 'decide', self.level)
+        self.set_value(var, val, self.DECISION, self.level)
+
+    def new_level(self):
+        """
+        opens an empty level
+        (for an assumption that is already True)
+        """
+        self.lim.append(len(self.stack))
+        self.level += 1
 
     # def evals_to(self, key, val):
     #     self.set_element(key, val, self.level, reason='semantic evaluation')
 
     def clausal_propagate(self, clause, lit):
-        logger.info(
-            "clausal_propagate\n"
-            "\tclause: %s\n"
-            "\tlit: %s\n", clause, lit)
         # maybe one wants to count differently
         self.stats.nb_clausal_propagations += 1
-        assert isinstance(clause, types.Clause)
-        assert isinstance(lit, types.Literal)
-        var, val = lit.atom, lit.bool
-        assert var.type == 'Bool'
-        reason = ('clausal propagation', clause)
-        if var.value is not None:
-            if var.value == val:
+        var, val = lit >> 1, not lit & 1
+        value = self.clauses.values[lit]
+        if value != 1:
+            if value == 2:
                 return
             else:
                 raise Conflict(clause)
-        self.set_value(var, val, reason, self.level)
+        self.set_value(var, val, clause, self.level)
+
+    def propagate(self):
+        """
+        clausal propagation of the clauses added since the last call
+        and of the assignments from head
+        returns the number of propagated assignments
+        """
+        clauses = self.clauses
+        values = clauses.values
+        for cref in clauses.take_pending():
+            unassigned = [lit for lit in clauses.literals(cref)
+                          if values[lit]]
+            if not unassigned:
+                raise Conflict(cref)
+            if len(unassigned) == 1:
+                self.clausal_propagate(cref, unassigned[0])
+        stack = self.stack
+        is_bool = self.variables.is_bool
+        enqueue = self.clausal_propagate
+        start = self.head
+        while self.head < len(stack):
+            lit = stack[self.head]
+            self.head += 1
+            if is_bool[lit >> 1]:
+                conflict = clauses.propagate(lit, enqueue)
+                if conflict is not None:
+                    raise Conflict(conflict)
+        return self.head - start
 
     def lit_lvl(self, lit):
-        assert isinstance(lit, types.Literal)
-        # logger.debug('lit_lvl\n\tlit: %s \n', lit)
-        return self.lvl[lit.atom]
+        return self.lvl[lit >> 1]
 
     def lit_reason(self, lit):
-        assert isinstance(lit, types.Literal)
-        # logger.debug('lit_reason\n\tlit: %s', lit)
-        return self.reason[lit.atom]
-
-    def topLiterals(self, clause):
-        assert isinstance(clause, types.Clause)
-        logger.debug(
-            'topLiterals:\n'
-            '\tclause: %s\n', clause)
-        lvls = [self.lit_lvl(lit) for lit in clause]
-        m = max(lvls)
-        return [lit for lit in clause if self.lit_lvl(lit) == m]
-
-    def can_backtrack_with(self, clause):
-        logger.debug(
-            'can_backtrack_with:\n'
-            '\tclause: %s\n', clause
-        )
-        # equivalent but less efficient:
-        # top = self.topLiterals(clause)
-        # return len(top) == 1 and self.lit_lvl(top[0]) > 0 or all(self.lit_reason(lit) == 'semantic evaluation' for lit in top)
-
-        maxlvl = -1
-        uip = True
-        semeval = True
-        for lit in clause:
-            lvl = self.lit_lvl(lit)
-            if lvl > maxlvl:
-                maxlvl = lvl
-                uip = True
-            elif lvl == maxlvl:
-                uip = False
-            if semeval:
-                semeval = self.lit_reason(lit) == 'semantic evaluation'
-        return uip and maxlvl > 0 or semeval
-
-    def backtrack_lvl_type(self, clause):
-        assert all(isinstance(lit, types.Literal) for lit in clause)
-        top = self.topLiterals(clause)
-        if len(top) == 1:
-            # The clause is an UIP
-            # (unique implication point)
-            return max((self.lit_lvl(i) for i in clause
-                        if not i in top),
-                       default=0), 'UIP'
-        else:
-            # it must be a semantic split clause
-            assert all(self.reason[lit.atom] == 'semantic evaluation')
-            return self.lit_lvl(top[0]) - 1, 'semantic split'
-
-    def backtrack_with(self, clause):
-        lvl, type = self.backtrack_lvl_type(clause)
-        logger.info('backtrack_with: \n'
-                    '\tclause %s\n'
-                    '\tlvl %s \n'
-                    '\ttype %s\n',
-                    clause, lvl, type)
-        for l in range(self.level, lvl, -1):
-            self.del_values_at_lvl(l)
-        self.level = lvl
+        return self.reason[lit >> 1]
+
+    def lbd(self, clause):
+        """
+        literal block distance: number of levels of the clause
+        """
+        lvl = self.lvl
+        return len({lvl[lit >> 1] for lit in clause})
+
+    def backtrack_with(self, clause, lvl, type, learn=True, lbd=0):
+        """
+        backtracks to lvl and adds the clause to the ClauseDB,
+        it is only kept as a reason if learn is False
+
+        the first literal of the clause is the one to assert
+        (see analyse_conflict)
+        """
+        self.backtrack(lvl)
         if type == 'UIP':
-            count = 0
-            for lit in clause:
-                if not self.has_value(lit.atom):
-                    self.clausal_propagate(clause, lit)
-                    count += 1
-            assert count == 1
+            cref = self.clauses.add(clause, learned=True, lbd=lbd,
+                                    watch=learn)
+            self.clausal_propagate(cref, clause[0])
         elif type == 'semantic split':
+            if learn:
+                self.clauses.add(clause, learned=True, lbd=lbd)
             # UNDO-DECIDE
             for lit in clause:
-                if not self.has_value(lit.atom):
-                    self.variables.assign(lit.atom)
-                    self.decide(lit.atom, lit.value)
+                if not self.has_value(lit >> 1):
+                    self.decide(lit >> 1, not lit & 1)
                     break
         else:
-            assert False
+            raise ValueError('unknown clause type %r' % type)
+
+    def analyse_conflict(self, cref):
+        """
+        first UIP conflict analysis
+
+        walks the stack backwards, resolving the conflict
+        clause with the reasons of its literals of the conflict
+        level, until only one of them remains
+
+        returns the learned clause, the backjump level and the type
+        of the clause ('UIP' or 'semantic split')
+        the clause is empty if the conflict is at level 0,
+        its first literal is the one to assert and the second one
+        has the backjump level
+        """
+        literals = self.clauses.literals
+        bump_clause = self.clauses.bump
+        lvl = self.lvl
+        reason = self.reason
+        seen = self.seen
+        stack = self.stack
 
-    def analyse_conflict(self, clause):
-        # TODO: optimize this part
-        assert isinstance(clause, types.Clause)
-        while clause and not self.can_backtrack_with(clause):
+        clause = literals(cref)
+        level = max((lvl[lit >> 1] for lit in clause), default=0)
+        if level == 0:
+            return [], -1, 'UIP'
+        # the conflict can be below the current level
+        # if the clause was added after the propagation
+        self.backtrack(level)
+        bump_clause(cref)
+
+        type = 'UIP'
+        learned = [None]
+        marked = []
+        backjump = 0
+        counter = 0
+        index = len(stack) - 1
+        while True:
             for lit in clause:
-                reason = self.lit_reason(lit)
-                if reason[0] == 'clausal propagation':
-                    clause = types.Clause.resolveB(clause, reason[1], lit)
-                    break
-        return clause
+                var = lit >> 1
+                if not seen[var] and lvl[var] > 0:
+                    seen[var] = 1
+                    marked.append(var)
+                    if lvl[var] == level:
+                        counter += 1
+                    else:
+                        learned.append(lit)
+                        if lvl[var] > backjump:
+                            backjump = lvl[var]
+                            learned[1], learned[-1] = lit, learned[1]
+            while not seen[stack[index] >> 1]:
+                index -= 1
+            uip = stack[index]
+            index -= 1
+            counter -= 1
+            if not counter:
+                break
+            if reason[uip >> 1] < 0:
+                # the other literals of the conflict level
+                # must be semantic evaluations
+                type = 'semantic split'
+                learned[1:1] = [
+                    lit ^ 1 for lit in stack[self.lim[level - 1]:index + 1]
+                    if seen[lit >> 1] and lvl[lit >> 1] == level]
+                backjump = level - 1
+                break
+            bump_clause(reason[uip >> 1])
+            clause = literals(reason[uip >> 1])
+        learned[0] = uip ^ 1
+        bump = self.variables.bump
+        for var in marked:
+            bump(var)
+        self.variables.decay()
+        self.stats.nb_learned_literals_before += len(learned)
+        if self.minimize and type == 'UIP':
+            self.minimize_learned(learned, marked)
+        self.stats.nb_learned_literals += len(learned)
+        for var in marked:
+            seen[var] = 0
+        return learned, backjump, type
+
+    def analyse_final(self, lit):
+        """
+        lit is an assumption that is False,
+        returns lit and the decisions (the previous assumptions)
+        that imply its negation
+        """
+        failed = [lit]
+        if not self.lvl[lit >> 1]:
+            return failed
+        literals = self.clauses.literals
+        lvl = self.lvl
+        reason = self.reason
+        seen = self.seen
+        seen[lit >> 1] = 1
+        for other in reversed(self.stack[self.lim[0]:]):
+            var = other >> 1
+            if not seen[var]:
+                continue
+            seen[var] = 0
+            if reason[var] == self.DECISION:
+                failed.append(other)
+            elif reason[var] == self.SEMANTIC:
+                # no explanation, all the decisions are kept
+                failed.extend(
+                    other for other in self.stack[self.lim[0]:]
+                    if reason[other >> 1] == self.DECISION and
+                    other not in failed)
+                break
+            else:
+                for other in literals(reason[var]):
+                    if lvl[other >> 1] > 0:
+                        seen[other >> 1] = 1
+        for other in self.stack[self.lim[0]:]:
+            seen[other >> 1] = 0
+        return failed
 
+    def minimize_learned(self, learned, marked):
+        """
+        recursive minimization of the learned clause:
+        removes (in place) the literals implied by the other ones
+        through their reasons
 
-class SolverStats(dict):
-    def __getitem__(self, key):
-        if not key in self:
-            self[key] = 0
-        return super().__getitem__(key)
+        the variables of the clause must be seen,
+        the ones proven redundant are marked as seen too
+        (and appended to marked)
+        """
+        lvl = self.lvl
+        # abstraction of the levels of the clause
+        abstract = 0
+        for lit in learned[1:]:
+            abstract |= 1 << (lvl[lit >> 1] & 31)
+        j = 1
+        for lit in learned[1:]:
+            if (self.reason[lit >> 1] < 0 or
+                    not self.redundant(lit, abstract, marked)):
+                learned[j] = lit
+                j += 1
+        del learned[j:]
+        # the literal of the backjump level may have been removed
+        if len(learned) > 2:
+            i = max(range(1, len(learned)),
+                    key=lambda i: lvl[learned[i] >> 1])
+            learned[1], learned[i] = learned[i], learned[1]
+
+    def redundant(self, lit, abstract, marked):
+        """
+        True if the false literal lit is implied by
+        the seen literals through the reasons
+        abstract prunes the search: a literal whose level
+        is not in the clause cannot be removed
+        """
+        literals = self.clauses.literals
+        lvl = self.lvl
+        reason = self.reason
+        seen = self.seen
+        top = len(marked)
+        todo = [lit]
+        while todo:
+            var = todo.pop() >> 1
+            for lit in literals(reason[var]):
+                other = lit >> 1
+                if other == var or seen[other] or not lvl[other]:
+                    continue
+                if reason[other] >= 0 and abstract & 1 << (lvl[other] & 31):
+                    seen[other] = 1
+                    marked.append(other)
+                    todo.append(lit)
+                else:
+                    for other in marked[top:]:
+                        seen[other] = 0
+                    del marked[top:]
+                    return False
+        return True
+
+
+class SolverStats():
+    """
+    Statistics of a Solver
+
+    The counters and times of the search are slots, the other
+    statistics are attributes created at 0 on first access.
+    The times (time_*) are cumulative seconds, and
+    hist_learned_length[i] (resp. hist_learned_lbd[i]) is the number
+    of learned clauses of length (resp. LBD) i, the last bucket
+    counting the longer ones.
+
+    A SolverStats is also a mapping (dict(stats) is a snapshot).
+    """
+
+    COUNTERS = (
+        'nb_vars', 'nb_clauses', 'nb_solves', 'nb_conflicts',
+        'nb_decisions', 'nb_clausal_propagations', 'nb_restarts',
+        'nb_rephases', 'nb_learned_clauses', 'nb_learned_literals',
+        'nb_learned_literals_before', 'nb_imported_clauses',
+        'nb_reductions', 'nb_deleted_clauses', 'nb_removed_clauses',
+        'nb_gc')
+    TIMES = ('time_propagation', 'time_analysis', 'time_backtracking',
+             'time_decisions', 'time_db')
+    HISTOGRAMS = ('hist_learned_length', 'hist_learned_lbd')
+    HISTOGRAM_SIZE = 32
+
+    __slots__ = COUNTERS + TIMES + HISTOGRAMS + ('__dict__',)
+
+    def __init__(self):
+        for key in self.COUNTERS:
+            setattr(self, key, 0)
+        for key in self.TIMES:
+            setattr(self, key, 0.)
+        for key in self.HISTOGRAMS:
+            setattr(self, key, [0] * self.HISTOGRAM_SIZE)
 
     def __getattr__(self, key):
-        try:
-            return super().__getattr__(key)
-        except AttributeError:
-            return self[key]
+        # only called for the attributes that do not exist yet
+        if key.startswith('__'):
+            raise AttributeError(key)
+        return 0
+
+    def keys(self):
+        return [*self.COUNTERS, *self.TIMES, *self.HISTOGRAMS,
+                *self.__dict__]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __getitem__(self, key):
+        return getattr(self, key)
 
-    def __setattr__(self, key, value):
-        self.__setitem__(key, value)
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __repr__(self):
+        return 'SolverStats(%r)' % dict(self)
+
+    def time(self):
+        """
+        time spent in the search
+        """
+        return sum(getattr(self, key) for key in self.TIMES)
+
+    def progress_line(self):
+        elapsed = self.time()
+        return ('c %9d conflicts %9d decisions %11d propagations '
+                '%8d learned %6d restarts %8.2fs %7.0f conflicts/s' % (
+                    self.nb_conflicts, self.nb_decisions,
+                    self.nb_clausal_propagations,
+                    self.nb_learned_clauses,
+                    self.nb_restarts, elapsed,
+                    self.nb_conflicts / max(elapsed, 1e-9)))
 
 
 class Solver():
 
-    def __init__(self, CDCL=True):
+    def __init__(self, CDCL=True, bcp='2wl', minimize=True,
+                 branching='vsids', phase_saving=True, rephase=1000,
+                 restarts='luby', reduce='lbd', reduce_interval=2000,
+                 reduce_inc=300, max_learned=None, preprocess=PASSES,
+                 seed=None, progress=0, on_progress=None, trace=None,
+                 proof=None, check=True, checkpoint_path=None,
+                 checkpoint_every=0, cache=None):
+        """
+        rephase is the number of conflicts before the first rephase
+        (see VarDB.rephase), the next ones are arithmetically spaced,
+        0 disables it
+
+        restarts is the name of a restart policy
+        (see utils.restarts.policies)
+
+        reduce is the key used to forget the learned clauses
+        (see ClauseDB.reduce_keys) or None to keep them all,
+        the first reduction happens after reduce_interval conflicts
+        and the interval grows by reduce_inc after each one.
+        If max_learned is set, the clauses are also reduced
+        as soon as there are more learned clauses,
+        the glue clauses included (if the reasons are too many
+        to go below it, the next one waits reduce_inc conflicts)
+
+        preprocess are the names of the passes run before
+        the first search (see preprocess.Preprocessor)
+
+        seed randomizes the initial order and phases (see VarDB)
+
+        every progress conflicts (0 disables it), on_progress
+        is called with the stats, by default it prints
+        SolverStats.progress_line to stderr
+
+        trace is the path of a file where the events of the search
+        are written (see trace.Trace), which slows it down
+
+        proof is the path of a binary DRAT proof, or a Proof,
+        the clauses learned from other solvers (see exchange)
+        cannot be justified in it. The proof of a path is closed
+        by close, a Proof is closed by the caller
+
+        if check is True, the original clauses are kept
+        in a ClauseMatrix to validate each model (see check_model)
+
+        every checkpoint_every conflicts (0 disables it), the solver
+        backtracks to level 0 and writes its state to checkpoint_path
+        (see checkpoint)
+
+        cache is the directory of a cache of learned clauses,
+        or a ClauseCache (see load_cache and save_cache)
+        """
+        if checkpoint_every and checkpoint_path is None:
+            raise ValueError('checkpoint_every needs a checkpoint_path')
+        # arguments saved by checkpoint
+        self.config = dict(
+            CDCL=CDCL, bcp=bcp, minimize=minimize, branching=branching,
+            phase_saving=phase_saving, rephase=rephase, restarts=restarts,
+            reduce=reduce, reduce_interval=reduce_interval,
+            reduce_inc=reduce_inc, max_learned=max_learned,
+            preprocess=list(preprocess), seed=seed, progress=progress,
+            check=check, checkpoint_path=checkpoint_path,
+            checkpoint_every=checkpoint_every,
+            cache=cache if cache is None or isinstance(cache, str)
+            else cache.directory)
         self.stats = SolverStats()
-        self.variables = types.VarDB(self.stats)
-        self.clauses = types.ClauseDB(self.stats)
-        self.trail = Trail(self.variables, self.clauses, self.stats)
+        self.variables = types.VarDB(self.stats, branching, phase_saving,
+                                     seed)
+        self.clauses = types.ClauseDB(self.stats, bcp)
+        if trace is None:
+            self.trace = None
+            self.trail = Trail(self.variables, self.clauses, self.stats,
+                               minimize)
+        else:
+            from .trace import Trace, TracedTrail
+            self.trace = Trace(trace)
+            self.trail = TracedTrail(self.trace, self.variables,
+                                     self.clauses, self.stats, minimize)
 
         self.CDCL = CDCL
+        # number of level 0 assignments at the last simplify
+        self.simplified = 0
+        self.rephase = rephase
+        self.next_rephase = rephase
+        self.restarts = restart_policies[restarts]()
+        self.stats.restart_policy = restarts
+        self.reduce = reduce
+        self.reduce_interval = reduce_interval
+        self.reduce_inc = reduce_inc
+        self.next_reduce = reduce_interval
+        self.max_learned = max_learned
+        # no reduction for max_learned before this number of conflicts
+        self.next_forced_reduce = 0
+        self.stats.reduce_policy = reduce
+        self.preprocessor = Preprocessor(self.clauses, self.variables,
+                                         self.trail, self.stats, preprocess)
+        self.preprocessed = not preprocess
+        # the original clauses are also the key of the cache
+        self.check = check
+        self.original = (ClauseMatrix() if check or cache is not None
+                         else None)
+        if cache is not None and not isinstance(cache, ClauseCache):
+            cache = ClauseCache(cache)
+        self.cache = cache
+        self.cache_loaded = False
+        # number of original clauses and their fingerprints
+        self.prints = 0, None
+        # the proof is closed by close if the solver opened it
+        self.owns_proof = proof is not None and not isinstance(proof, Proof)
+        if self.owns_proof:
+            proof = Proof(proof)
+        self.proof = proof
+        if proof is not None:
+            if proof.lrat:
+                if preprocess:
+                    raise ValueError('LRAT proofs need preprocess=()')
+                if cache is not None:
+                    raise ValueError('LRAT proofs cannot use a cache')
+                self.clauses.ids = {}
+            self.clauses.proof = proof
+            self.preprocessor.proof = proof
+        # False once the clauses are known to be unsat
+        self.ok = True
+        # assumptions responsible for the last UNSAT answer
+        self.failed = []
+        # why the last search was stopped: the exhausted budget
+        # ('conflicts', 'propagations', 'decisions' or 'time')
+        # or 'interrupt' (None if it was not)
+        self.stopped = None
+        # set by interrupt, possibly from another thread
+        self.interrupted = False
+        # learned clauses exchange with other solvers
+        # (see portfolio.Exchange)
+        self.exchange = None
+        self.progress = progress
+        self.next_progress = progress
+        self.on_progress = on_progress or self.print_progress
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.next_checkpoint = checkpoint_every
 
     def BoolVar(self, name):
         self.stats.nb_vars += 1
         # priority = kwargs.get('priority')
         var = types.BoolVar(name)
-        self.variables.add(var)
+        self.trail.add_var(var)
         return var
 
     def Literal(self, *args, **kwargs):
@@ -224,20 +626,43 @@ class Solver():
         return lit
 
     def Clause(self, *args, **kwargs):
+        """
+        args are Literal, the ClauseDB
+        receives the clause of their codes
+        """
         self.stats.nb_clauses += 1
         clause = types.Clause(*args, **kwargs)
-        self.clauses.add(clause)
+        codes = types.Clause(*(lit.code for lit in clause))
+        if self.original is not None:
+            self.original.add(codes)
+        self.thaw(codes)
+        self.clauses.add(codes)
         return clause
 
-    def clausal_propagate(self):
-        try:
-            raise Conflict(next(self.clauses.unsat_clauses()))
-        except StopIteration:
-            pass
-        unit_clauses = list(self.clauses.unit_clauses())
-        for clause, lit in unit_clauses:
-            self.trail.clausal_propagate(clause, lit)
-        return unit_clauses
+    def add_clauses(self, lits, offsets):
+        """
+        adds the clauses lits[offsets[i]:offsets[i + 1]]
+        where lits are literal codes (see Literal.code)
+        """
+        self.stats.nb_clauses += len(offsets) - 1
+        if self.original is not None:
+            self.original.add_clauses(lits, offsets)
+        self.thaw(lits)
+        self.clauses.add_clauses(lits, offsets)
+
+    def thaw(self, lits):
+        """
+        reintroduces the variables of the literal codes lits
+        that were eliminated by the preprocessing
+        """
+        eliminated = self.preprocessor.eliminated_vars
+        if not eliminated:
+            return
+        todo = {lit >> 1 for lit in lits} & eliminated
+        while todo:
+            for clause in self.preprocessor.restore(todo.pop()):
+                self.clauses.add(sorted(clause))
+                todo.update({lit >> 1 for lit in clause} & eliminated)
 
     def semantic_propagate(self):
         units = list(self.variables.watches.units())
@@ -247,45 +672,588 @@ class Solver():
         return units
 
     def propagate(self):
-        while self.clausal_propagate() or self.semantic_propagate():
-            pass
+        self.trail.propagate()
+        while self.semantic_propagate():
+            self.trail.propagate()
+
+    def simplify(self):
+        """
+        at level 0, removes the satisfied clauses
+        and compacts the arena
+        """
+        assigned = len(self.trail.stack)
+        if assigned == self.simplified:
+            return
+        self.simplified = assigned
+        self.clauses.simplify(self.trail.reason)
+        self.clauses.gc(self.trail.reason)
+
+    def reduce_db(self):
+        """
+        forgets learned clauses when it is scheduled
+        or when there are more than max_learned
+        """
+        if self.reduce is None:
+            return
+        if self.stats.nb_conflicts >= self.next_reduce:
+            self.clauses.reduce(self.trail.reason, self.reduce)
+            self.reduce_interval += self.reduce_inc
+            self.next_reduce = self.stats.nb_conflicts + self.reduce_interval
+        elif (self.max_learned is not None and
+              self.clauses.nb_learned > self.max_learned and
+              self.stats.nb_conflicts >= self.next_forced_reduce):
+            self.clauses.reduce(self.trail.reason, self.reduce, glue=0)
+            if self.clauses.nb_learned > self.max_learned:
+                self.next_forced_reduce = (self.stats.nb_conflicts +
+                                           self.reduce_inc)
+        else:
+            return
+        if self.trace is not None:
+            self.trace.reduce(self.clauses.nb_learned)
+        self.clauses.gc(self.trail.reason)
+
+    def import_clauses(self):
+        """
+        at level 0, adds the clauses learned by the other solvers
+        returns the number of clauses
+        """
+        clauses = self.exchange.fetch()
+        for clause, lbd in clauses:
+            self.thaw(clause)
+            self.clauses.add(clause, learned=True, lbd=lbd)
+        self.stats.nb_imported_clauses += len(clauses)
+        return len(clauses)
+
+    def check_model(self):
+        """
+        raises a RuntimeError if the values of the variables
+        do not satisfy all the original clauses
+        """
+        dbt = perf_counter()
+        unsatisfied = self.original.unsatisfied(self.variables.model())
+        self.stats.time_check += perf_counter() - dbt
+        if unsatisfied:
+            raise RuntimeError('invalid model: %s clauses are not satisfied,'
+                               ' for instance %s' % (
+                                   len(unsatisfied),
+                                   list(self.original.clause(unsatisfied[0]))))
+
+    def fingerprints(self):
+        """
+        fingerprints of the original clauses (see cache.fingerprints)
+        """
+        size, prints = self.prints
+        if size != len(self.original):
+            prints = fingerprints(self.original.lits, self.original.offsets)
+            self.prints = len(self.original), prints
+        return prints
+
+    def implied(self, clause):
+        """
+        at level 0, returns True if the propagation of the negation
+        of the clause (whose literals are unassigned) is a conflict
+        """
+        trail = self.trail
+        for lit in clause:
+            trail.decide(lit >> 1, bool(lit & 1))
+        try:
+            self.propagate()
+        except Conflict:
+            return True
+        finally:
+            trail.backtrack(0)
+        return False
+
+    def load_cache(self):
+        """
+        at level 0, adds the clauses of the cache entry of the original
+        clauses (see cache.ClauseCache.lookup) that are implied by
+        the clauses (see implied), propagates them
+        and sets the saved phases
+        """
+        dbt = perf_counter()
+        stats = self.stats
+        self.cache_loaded = True
+        arrays = self.cache.lookup(self.fingerprints())
+        if arrays is None:
+            stats.time_cache += perf_counter() - dbt
+            return
+        stats.nb_cache_hits += 1
+        variables = self.variables
+        values = self.clauses.values
+        eliminated = self.preprocessor.eliminated_vars
+        try:
+            self.propagate()
+        except Conflict:
+            # the search finds it again
+            self.clauses.add([])
+            stats.time_cache += perf_counter() - dbt
+            return
+        cached = arrays['clauses']
+        i = 0
+        while i < len(cached):
+            size, lbd = cached[i:i + 2]
+            clause = cached[i + 2:i + 2 + size]
+            i += 2 + size
+            if any(lit >> 1 >= len(variables) or lit >> 1 in eliminated
+                   for lit in clause):
+                continue
+            values_of = list(map(values.__getitem__, clause))
+            if 2 in values_of:
+                continue
+            # without the literals False at level 0
+            clause = [lit for lit, value in zip(clause, values_of) if value]
+            if not clause or not self.implied(clause):
+                stats.nb_cache_rejected += 1
+                continue
+            if self.proof is not None:
+                self.proof.add(clause)
+            self.clauses.add(clause, learned=len(clause) > 1,
+                             lbd=min(lbd, len(clause)))
+            stats.nb_cached_clauses += 1
+            try:
+                # the units are fixed at level 0, not by the next implied
+                self.propagate()
+            except Conflict:
+                self.clauses.add([])
+                break
+        # after implied, whose backtracks save phases
+        phase = arrays['phase'][:len(variables)]
+        variables.phase[:len(phase)] = phase
+        variables.target_size = variables.best_size = 0
+        stats.time_cache += perf_counter() - dbt
+
+    def save_cache(self):
+        """
+        at level 0, stores in the cache the short learned clauses
+        with a low LBD, the level 0 assignments and the saved phases
+        """
+        dbt = perf_counter()
+        cache = self.cache
+        arena = self.clauses.arena
+        # length, LBD and literals of each clause
+        clauses = array('i')
+        for cref in self.clauses.crefs():
+            if (arena[cref + FLAGS] & LEARNED and
+                    1 < arena[cref] <= cache.max_length and
+                    arena[cref + LBD] <= cache.max_lbd):
+                clauses.extend((arena[cref], arena[cref + LBD]))
+                clauses.extend(self.clauses.literals(cref))
+        # after the clauses that imply them
+        for lit in self.trail.stack:
+            clauses.extend((1, 1, lit))
+        cache.store(self.fingerprints(), clauses, self.variables.phase)
+        self.stats.time_cache += perf_counter() - dbt
+
+    def write_lemma(self, clause, conflict):
+        """
+        writes to the proof the clause learned
+        from the conflict clause, before backtracking
+        """
+        proof = self.proof
+        if proof.lrat:
+            proof.add(clause, self.clauses.nb_ids + 1,
+                      lrat_hints(self.trail, conflict, clause))
+        else:
+            proof.add(clause)
+
+    def flush_proof(self):
+        proof = self.proof
+        proof.flush()
+        self.stats.nb_proof_additions = proof.nb_additions
+        self.stats.nb_proof_deletions = proof.nb_deletions
+        self.stats.proof_bytes = proof.bytes
+        self.stats.time_proof = proof.time
+
+    def print_progress(self, stats):
+        print(stats.progress_line(), file=sys.stderr, flush=True)
+
+    def close(self):
+        """
+        closes the trace and the proof opened by the solver
+        (the proof is complete once closed)
+        """
+        if self.trace is not None:
+            self.trace.close()
+        if self.owns_proof:
+            self.proof.close()
+
+    def __del__(self):
+        # __init__ may have failed before
+        if getattr(self, 'owns_proof', False):
+            self.proof.close()
+
+    def checkpoint(self, path):
+        """
+        writes the state of the solver at level 0 to path
+        (see the module checkpoint): the configuration, the stats,
+        the variables with their activities and phases, the clauses
+        (with the learned ones, their LBD and activity), the level 0
+        assignments and the clauses of the eliminated variables
+
+        the restart policy and the exchange are not saved
+        """
+        dbt = perf_counter()
+        self.trail.backtrack(0)
+        variables = self.variables
+        if not all(variables.is_bool):
+            raise ValueError('only Bool variables can be saved')
+        names = [var.name for var in variables.by_index]
+        if not all(isinstance(name, (str, int)) for name in names):
+            raise ValueError('only str and int names can be saved')
+        arena = self.clauses.arena
+        clauses = array('i')
+        for cref in self.clauses.crefs():
+            clauses.extend(arena[cref:cref + HEADER + arena[cref]])
+        # for each eliminated variable: the variable, its numbers
+        # of positive and negative clauses, then each clause
+        # preceded by its length
+        eliminated = array('i')
+        for var, pos, neg in self.preprocessor.eliminated:
+            eliminated.extend((var, len(pos), len(neg)))
+            for clause in pos + neg:
+                eliminated.append(len(clause))
+                eliminated.extend(sorted(clause))
+        arrays = dict(
+            clauses=clauses, units=self.trail.stack,
+            activity=variables.activity,
+            phase=array('B', variables.phase),
+            target_phase=array('B', variables.target_phase),
+            best_phase=array('B', variables.best_phase),
+            eliminated=eliminated)
+        if self.original is not None:
+            arrays['original_lits'] = self.original.lits
+            arrays['original_offsets'] = self.original.offsets
+        self.stats.nb_checkpoints += 1
+        state = dict(
+            ok=self.ok, preprocessed=self.preprocessed,
+            cache_loaded=self.cache_loaded,
+            next_rephase=self.next_rephase,
+            reduce_interval=self.reduce_interval,
+            next_reduce=self.next_reduce,
+            next_forced_reduce=self.next_forced_reduce,
+            next_progress=self.next_progress,
+            next_checkpoint=self.next_checkpoint,
+            var_inc=variables.var_inc, target_size=variables.target_size,
+            best_size=variables.best_size)
+        write_checkpoint(path, dict(config=self.config, names=names,
+                                    state=state, stats=dict(self.stats)),
+                         arrays)
+        self.stats.time_checkpoint += perf_counter() - dbt
+
+    @classmethod
+    def resume(cls, path, **kwargs):
+        """
+        returns a Solver in the state saved by checkpoint to path,
+        at level 0, kwargs replace the saved configuration
+        (for instance progress or trace)
+
+        a resumed solver cannot write a proof
+        """
+        if kwargs.get('proof') is not None:
+            raise ValueError('a resumed solver cannot write a proof')
+        header, arrays = read_checkpoint(path)
+        config = dict(header['config'], **kwargs)
+        config['preprocess'] = tuple(config['preprocess'])
+        solver = cls(**config)
+        if solver.original is not None:
+            if 'original_lits' not in arrays:
+                raise ValueError('%s has no original clauses to check '
+                                 'the models (check=False)' % path)
+            solver.original.add_clauses(arrays['original_lits'],
+                                        arrays['original_offsets'])
+        for name in header['names']:
+            solver.BoolVar(name)
+        variables = solver.variables
+        variables.activity[:] = arrays['activity']
+        variables.phase[:] = arrays['phase']
+        variables.target_phase[:] = arrays['target_phase']
+        variables.best_phase[:] = arrays['best_phase']
+        for index in range(len(variables)):
+            variables.pq.push(index, variables.key(index))
+        eliminated = arrays['eliminated']
+        i = 0
+        while i < len(eliminated):
+            var, nb_pos, nb_neg = eliminated[i:i + 3]
+            i += 3
+            lists = []
+            for _ in range(nb_pos + nb_neg):
+                lists.append(frozenset(eliminated[i + 1:i + 1 +
+                                                  eliminated[i]]))
+                i += 1 + eliminated[i]
+            solver.preprocessor.eliminated.append(
+                (var, lists[:nb_pos], lists[nb_pos:]))
+            solver.preprocessor.eliminated_vars.add(var)
+            variables.pq.remove(var)
+        clauses = solver.clauses
+        arena = arrays['clauses']
+        cref = 0
+        while cref < len(arena):
+            nxt = cref + HEADER + arena[cref]
+            new = clauses.add(arena[cref + HEADER:nxt],
+                              learned=bool(arena[cref + FLAGS] & LEARNED),
+                              lbd=arena[cref + LBD])
+            clauses.arena[new + ACTIVITY] = arena[cref + ACTIVITY]
+            cref = nxt
+        for lit in arrays['units']:
+            clauses.add([lit])
+        state = header['state']
+        for key in ('ok', 'preprocessed', 'cache_loaded', 'next_rephase',
+                    'reduce_interval', 'next_reduce', 'next_forced_reduce',
+                    'next_progress', 'next_checkpoint'):
+            setattr(solver, key, state[key])
+        for key in ('var_inc', 'target_size', 'best_size'):
+            setattr(variables, key, state[key])
+        for key, value in header['stats'].items():
+            solver.stats[key] = value
+        solver.stats.nb_resumes += 1
+        return solver
+
+    def preprocess(self, frozen=()):
+        """
+        runs the preprocessing at level 0,
+        the variables of frozen are not eliminated
+        returns False if the formula is unsat
+        """
+        self.preprocessed = True
+        self.trail.backtrack(0)
+        return self.preprocessor.run(frozen)
+
+    def interrupt(self):
+        """
+        stops the search at its next conflict or decision,
+        it can be called from another thread (or a signal handler)
+
+        if no search is running, the next one stops immediately
+        """
+        self.interrupted = True
+
+    def solve(self, assumptions=(), conflicts=None, propagations=None,
+              decisions=None, time=None):
+        """
+        assumptions are Literal that must be True
+
+        returns the list of the variables with their values
+        if the clauses are satisfiable with the assumptions,
+        False otherwise, and then failed is the list of
+        the assumptions responsible (empty if the clauses are unsat)
+        or UNKNOWN (None) if the search was stopped, and then
+        stopped is the reason (see interrupt)
+
+        the budgets of the search are its numbers of conflicts,
+        clausal propagations and decisions and its duration
+        in seconds (None for no limit)
+
+        the solver is left at level 0, with its learned clauses,
+        activities and phases, so that clauses can be added
+        and solve called again
+        """
+        self.stats.nb_solves += 1
+        self.failed = []
+        self.stopped = None
+        if not self.ok:
+            return False
+        by_code = {lit.code: lit for lit in assumptions}
+        codes = list(by_code)
+        if self.trace is not None:
+            self.trace.solve(codes)
+        if not self.preprocessed:
+            self.preprocess({lit >> 1 for lit in codes})
+        self.thaw(codes)
+        if self.cache is not None and not self.cache_loaded:
+            self.load_cache()
+        ans = None
+        try:
+            ans = self.search(codes, conflicts, propagations, decisions,
+                              time)
+        finally:
+            self.trail.backtrack(0)
+            if self.trace is not None:
+                self.trace.result(ans)
+            if self.proof is not None:
+                self.flush_proof()
+        if self.cache is not None:
+            self.save_cache()
+        if ans is False:
+            self.failed = [by_code[lit] for lit in self.failed]
+        return ans
+
+    async def solve_async(self, assumptions=(), context=None, **budgets):
+        """
+        coroutine of solve (same arguments and answer) that runs
+        the search in a worker process (see worker), so that
+        the event loop is not blocked and the search can be
+        cancelled (or given a timeout by asyncio.wait_for)
+
+        the worker starts from a checkpoint of the solver,
+        the values of the variables, failed, stopped and the stats
+        are updated, but the clauses learned by the worker are lost
+
+        context is a multiprocessing context
+        """
+        from .worker import solve
+        return await solve(self, assumptions, context, **budgets)
+
+    def stop(self, max_conflicts, max_propagations, max_decisions):
+        """
+        returns UNKNOWN, stopped is the first exhausted budget
+        (see search) or 'interrupt'
+        """
+        stats = self.stats
+        if self.interrupted:
+            self.interrupted = False
+            self.stopped = 'interrupt'
+        elif stats.nb_conflicts >= max_conflicts:
+            self.stopped = 'conflicts'
+        elif stats.nb_clausal_propagations >= max_propagations:
+            self.stopped = 'propagations'
+        elif stats.nb_decisions >= max_decisions:
+            self.stopped = 'decisions'
+        else:
+            self.stopped = 'time'
+        stats['nb_stopped_' + self.stopped] += 1
+        return UNKNOWN
+
+    def search(self, assumptions, conflicts=None, propagations=None,
+               decisions=None, time=None):
+        """
+        CDCL loop, assumptions are literal codes
+        that are decided first
+
+        the budgets (see solve) are checked after each conflict
+        and before each decision
 
-    def solve(self):
+        the time of each phase is added to its stats.time_*,
+        a phase ends when the next one starts
+        """
+        values = self.clauses.values
+        stats = self.stats
+        length_hist = stats.hist_learned_length
+        lbd_hist = stats.hist_learned_lbd
+        top = stats.HISTOGRAM_SIZE - 1
+        # the budgets as limits of the stats
+        inf = float('inf')
+        max_conflicts = (inf if conflicts is None
+                         else stats.nb_conflicts + conflicts)
+        max_propagations = (inf if propagations is None
+                            else stats.nb_clausal_propagations + propagations)
+        max_decisions = (inf if decisions is None
+                         else stats.nb_decisions + decisions)
+        last = perf_counter()
+        deadline = inf if time is None else last + time
         while True:
             try:
                 self.propagate()
             except Conflict as conflict:
-                # return conflict
-                # if logger.isEnabledFor(logger.INFO):
-                #     logger.info('TRAIL:\n%s\n',
-                #                 logger.pformat({var: (self.trail.values[var], self.trail.lvl[var]) for var in self.trail.values}))
-                logger.info('CONFLICT\n'
-                            '\tconflict: %s\n',
-                            conflict)
-
-                analyzed_conflict = self.trail.analyse_conflict(
+                now = perf_counter()
+                stats.time_propagation += now - last
+                last = now
+                stats.nb_conflicts += 1
+                analyzed_conflict, lvl, type = self.trail.analyse_conflict(
                     conflict.clause)
-                logger.info('CONFLICT\n'
-                            '\tconflict: %s\n'
-                            '\tanalyzed conflict: %s\n',
-                            conflict, analyzed_conflict)
+                if self.proof is not None:
+                    self.write_lemma(analyzed_conflict, conflict.clause)
                 if not analyzed_conflict:
-                    print('UNSAT')
+                    self.ok = False
+                    stats.time_analysis += perf_counter() - last
                     return False
                 else:
-                    self.trail.backtrack_with(analyzed_conflict)
+                    lbd = self.trail.lbd(analyzed_conflict)
+                    length_hist[min(len(analyzed_conflict), top)] += 1
+                    lbd_hist[min(lbd, top)] += 1
+                    self.restarts.conflict(lbd)
+                    now = perf_counter()
+                    stats.time_analysis += now - last
+                    last = now
                     # CDCL is happening here
+                    self.trail.backtrack_with(analyzed_conflict, lvl, type,
+                                              self.CDCL, lbd)
+                    now = perf_counter()
+                    stats.time_backtracking += now - last
+                    last = now
                     if self.CDCL:
-                        self.clauses.add(analyzed_conflict)
-                        self.stats.nb_learned_clauses += 1
+                        stats.nb_learned_clauses += 1
+                        if self.exchange is not None:
+                            self.exchange.export(analyzed_conflict, lbd)
+                        self.reduce_db()
+                    if self.rephase and (stats.nb_conflicts >=
+                                         self.next_rephase):
+                        self.variables.rephase()
+                        if self.trace is not None:
+                            self.trace.rephase(stats.nb_rephases - 1)
+                        self.next_rephase += (self.rephase *
+                                              (stats.nb_rephases + 1))
+                    if (self.checkpoint_every and
+                            stats.nb_conflicts >= self.next_checkpoint):
+                        self.next_checkpoint = (stats.nb_conflicts +
+                                                self.checkpoint_every)
+                        # backtracks to level 0
+                        self.checkpoint(self.checkpoint_path)
+                    now = perf_counter()
+                    stats.time_db += now - last
+                    last = now
+                    if (self.progress and
+                            stats.nb_conflicts >= self.next_progress):
+                        self.next_progress += self.progress
+                        self.on_progress(stats)
+                    if (stats.nb_conflicts >= max_conflicts or
+                            stats.nb_clausal_propagations >=
+                            max_propagations or
+                            now >= deadline or self.interrupted):
+                        return self.stop(max_conflicts, max_propagations,
+                                         max_decisions)
             else:
-                # if logger.isEnabledFor(logger.INFO):
-                #     logger.info('TRAIL:\n%s\n',
-                #                 logger.pformat({var: (self.trail.values[var], self.trail.lvl[var]) for var in self.trail.values}))
-                if not self.variables.can_decide():
-                    print('SAT')
+                now = perf_counter()
+                stats.time_propagation += now - last
+                last = now
+                if (stats.nb_clausal_propagations >= max_propagations or
+                        now >= deadline or self.interrupted):
+                    return self.stop(max_conflicts, max_propagations,
+                                     max_decisions)
+                if self.trail.level and self.restarts.restart():
+                    stats.nb_restarts += 1
+                    if self.trace is not None:
+                        self.trace.restart()
+                    self.trail.backtrack(0)
+                    now = perf_counter()
+                    stats.time_backtracking += now - last
+                    last = now
+                    continue
+                if self.trail.level == 0:
+                    if self.exchange is not None and self.import_clauses():
+                        now = perf_counter()
+                        stats.time_db += now - last
+                        last = now
+                        continue
+                    self.simplify()
+                    now = perf_counter()
+                    stats.time_db += now - last
+                    last = now
+                if self.trail.level < len(assumptions):
+                    lit = assumptions[self.trail.level]
+                    if values[lit] == 0:
+                        self.failed = self.trail.analyse_final(lit)
+                        stats.time_analysis += perf_counter() - last
+                        return False
+                    if values[lit] == 2:
+                        self.trail.new_level()
+                    else:
+                        self.trail.decide(lit >> 1, not lit & 1)
+                elif not self.variables.can_decide():
+                    values = values.copy()
+                    self.preprocessor.extend(values)
+                    self.variables.export(values)
+                    stats.time_decisions += perf_counter() - last
+                    if self.check:
+                        self.check_model()
                     return list(self.variables.vars.values())
                 else:
+                    if stats.nb_decisions >= max_decisions:
+                        return self.stop(max_conflicts, max_propagations,
+                                         max_decisions)
                     var = self.variables.pop()
-                    logger.info('DECiDE %s\n', var)
-                    self.trail.decide(var, var.decide())
+                    stats.nb_decisions += 1
+                    self.trail.decide(var, self.variables.decide(var))
+                now = perf_counter()
+                stats.time_decisions += now - last
+                last = now
@@ -0,0 +1,186 @@
+"""
+Bulk evaluation of clauses
+
+A ClauseMatrix stores clauses as a compressed sparse row matrix:
+the literal codes of the clause i are lits[offsets[i]:offsets[i + 1]].
+Under an assignment (literal code -> value, as in the ClauseDB:
+0 False, 1 unassigned, 2 True) it finds all the unsatisfied,
+falsified or unit clauses in one pass.
+
+With NumPy, the values of the literals are gathered and reduced
+per clause (numpy.maximum.reduceat). Without it, they are gathered
+(by map, one call per literal) into a bytes object with a separator
+after each clause, which is searched with a regular expression:
+only the clauses that match (for instance the unsatisfied ones)
+are handled by Python code.
+"""
+
+import re
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .watches import FLAGS
+from .types.clauses import LEARNED
+
+# value of the separator of the clauses (without NumPy)
+SEPARATOR = 3
+
+
+def clauses_of(values):
+    """
+    regular expression of the clauses whose gathered values
+    match the pattern values (see ClauseMatrix.evaluate)
+    """
+    return re.compile(b'(?<![^%c])%s%c' % (SEPARATOR, values, SEPARATOR))
+
+
+# without a True literal
+UNSATISFIED = clauses_of(b'[\0\1]*')
+# only False literals
+FALSIFIED = clauses_of(b'\0*')
+# one unassigned literal (the group 1), the others False
+UNIT = clauses_of(b'\0*(\1)\0*')
+
+
+class ClauseMatrix():
+    """
+    Clauses in CSR format
+
+    If numpy is None, NumPy is used if it is installed.
+    The arrays of the evaluation are cached until the next addition.
+    """
+
+    def __init__(self, numpy=None):
+        self.lits = array('i')
+        self.offsets = array('q', [0])
+        self.numpy = np is not None if numpy is None else numpy
+        if self.numpy and np is None:
+            raise ImportError('NumPy is not installed')
+        self.cache = None
+
+    @classmethod
+    def from_clausedb(cls, clauses, learned=True, numpy=None):
+        """
+        matrix of the clauses of a ClauseDB (without the learned ones
+        unless learned is True), crefs maps the rows to the references
+        """
+        matrix = cls(numpy)
+        arena = clauses.arena
+        matrix.crefs = [cref for cref in clauses.crefs()
+                        if learned or not arena[cref + FLAGS] & LEARNED]
+        for cref in matrix.crefs:
+            matrix.add(clauses.literals(cref))
+        return matrix
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def add(self, clause):
+        self.lits.extend(clause)
+        self.offsets.append(len(self.lits))
+        self.cache = None
+
+    def add_clauses(self, lits, offsets):
+        """
+        adds the clauses lits[offsets[i]:offsets[i + 1]]
+        (see ClauseDB.add_clauses)
+        """
+        shift = len(self.lits) - offsets[0]
+        self.lits.extend(lits[offsets[0]:offsets[-1]])
+        self.offsets.extend(offset + shift for offset in offsets[1:])
+        self.cache = None
+
+    def clause(self, i):
+        return self.lits[self.offsets[i]:self.offsets[i + 1]]
+
+    def evaluate(self, values):
+        """
+        with NumPy: (best, free, gathered) where best is the best value
+        of the literals of each clause (0 for the empty clause),
+        free its number of unassigned literals and gathered
+        the values of all the literals
+
+        without: the values of the literals as bytes,
+        each clause is followed by SEPARATOR
+        """
+        if self.numpy:
+            if self.cache is None:
+                self.cache = (np.array(self.lits, dtype=np.int64),
+                              np.array(self.offsets, dtype=np.int64))
+            lits, offsets = self.cache
+            gathered = np.frombuffer(bytes(values), dtype=np.uint8)[lits]
+            starts = offsets[:-1]
+            nonempty = np.flatnonzero(offsets[1:] > starts)
+            best = np.zeros(len(self), dtype=np.uint8)
+            free = np.zeros(len(self), dtype=np.int64)
+            if len(nonempty):
+                starts = starts[nonempty]
+                best[nonempty] = np.maximum.reduceat(gathered, starts)
+                free[nonempty] = np.add.reduceat(
+                    (gathered == 1).astype(np.int64), starts)
+            return best, free, gathered
+        if self.cache is None:
+            flat = array('i')
+            lits = self.lits
+            start = 0
+            for end in self.offsets[1:]:
+                flat.extend(lits[start:end])
+                flat.append(-1)
+                start = end
+            self.cache = flat
+        table = bytes(values) + bytes((SEPARATOR,))
+        return bytes(map(table.__getitem__, self.cache))
+
+    def matches(self, pattern, values):
+        """
+        (index, match) of the clauses that match pattern (without NumPy)
+        """
+        gathered = self.evaluate(values)
+        separator = bytes((SEPARATOR,))
+        ans = []
+        row = end = 0
+        for match in pattern.finditer(gathered):
+            row += gathered.count(separator, end, match.start())
+            end = match.start()
+            ans.append((row, match))
+        return ans
+
+    def unsatisfied(self, values):
+        """
+        indices of the clauses without a True literal
+        """
+        if self.numpy:
+            best, _, _ = self.evaluate(values)
+            return np.flatnonzero(best != 2).tolist()
+        return [i for i, _ in self.matches(UNSATISFIED, values)]
+
+    def falsified(self, values):
+        """
+        indices of the clauses whose literals are all False
+        """
+        if self.numpy:
+            best, _, _ = self.evaluate(values)
+            return np.flatnonzero(best == 0).tolist()
+        return [i for i, _ in self.matches(FALSIFIED, values)]
+
+    def units(self, values):
+        """
+        (index, literal) of the clauses without a True literal
+        and with exactly one unassigned literal
+        """
+        if self.numpy:
+            best, free, gathered = self.evaluate(values)
+            unit = (best == 1) & (free == 1)
+            lits, offsets = self.cache
+            position = np.flatnonzero(gathered == 1)
+            row = np.searchsorted(offsets, position, side='right') - 1
+            keep = unit[row]
+            return list(zip(row[keep].tolist(),
+                            lits[position[keep]].tolist()))
+        matches = self.matches(UNIT, values)
+        flat = self.cache
+        return [(i, flat[match.start(1)]) for i, match in matches]
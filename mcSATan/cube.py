@@ -0,0 +1,209 @@
+"""
+Cube-and-conquer: a lookahead splits the formula into cubes
+(conjunctions of literals) that are solved in a process pool
+as assumptions of incremental solvers
+
+from "Cube and Conquer: Guiding CDCL SAT Solvers by Lookaheads"
+by M. Heule, O. Kullmann, S. Wieringa and A. Biere
+"""
+
+import multiprocessing
+from time import time
+
+from .core import Conflict
+from .parsers.DIMACS import parse_cnf
+from . import types
+
+
+class Lookahead():
+    """
+    Splits the formula of a Solver at level 0
+
+    Each free Bool variable among the candidates most
+    occurring ones is probed: both of its literals are decided
+    and propagated. A literal whose propagation fails is a failed
+    literal and its negation is implied, otherwise the variable
+    is scored by the product of the numbers of propagated
+    assignments. The best variable is the split variable.
+    """
+
+    def __init__(self, solver, candidates=30):
+        self.solver = solver
+        self.trail = solver.trail
+        self.stats = solver.stats
+        clauses = solver.clauses
+        occurrences = [0] * len(solver.variables)
+        for cref in clauses.crefs():
+            for lit in clauses.literals(cref):
+                occurrences[lit >> 1] += 1
+        is_bool = solver.variables.is_bool
+        self.candidates = sorted(
+            (var for var in range(len(occurrences))
+             if is_bool[var] and occurrences[var]),
+            key=occurrences.__getitem__, reverse=True)
+        self.nb_candidates = candidates
+
+    def assume(self, lit):
+        """
+        decides lit and propagates
+        returns False (and undoes it) if there is a conflict
+        """
+        trail = self.trail
+        trail.decide(lit >> 1, not lit & 1)
+        try:
+            self.solver.propagate()
+        except Conflict:
+            trail.backtrack(trail.level - 1)
+            return False
+        return True
+
+    def probe(self, lit):
+        """
+        returns the number of assignments implied by lit,
+        None if it is a failed literal
+        """
+        start = len(self.trail.stack)
+        if not self.assume(lit):
+            return None
+        ans = len(self.trail.stack) - start
+        self.trail.backtrack(self.trail.level - 1)
+        return ans
+
+    def cubes(self, depth):
+        """
+        returns the cubes (lists of literal codes) of the splits
+        up to depth, without the cubes refuted by the lookahead
+        """
+        dbt = time()
+        cubes = []
+        self.trail.backtrack(0)
+        try:
+            self.solver.propagate()
+        except Conflict:
+            pass
+        else:
+            self.split([], depth, cubes)
+            self.trail.backtrack(0)
+        self.stats.nb_cubes = len(cubes)
+        self.stats.time_lookahead += time() - dbt
+        return cubes
+
+    def split(self, cube, depth, cubes):
+        """
+        the literals of cube are decided and propagated
+        """
+        if not depth:
+            cubes.append(cube)
+            return
+        trail = self.trail
+        best = None
+        probed = 0
+        for var in self.candidates:
+            if trail.has_value(var):
+                continue
+            pos, neg = self.probe(2 * var), self.probe(2 * var + 1)
+            if pos is None or neg is None:
+                self.stats.nb_failed_literals += 1
+                if pos is None and neg is None:
+                    self.stats.nb_refuted_cubes += 1
+                    return
+                lit = 2 * var + (pos is None)
+                if self.assume(lit):
+                    self.split(cube + [lit], depth, cubes)
+                    trail.backtrack(trail.level - 1)
+                else:
+                    self.stats.nb_refuted_cubes += 1
+                return
+            score = pos * neg + pos + neg
+            if best is None or score > best[0]:
+                best = score, var
+            probed += 1
+            if probed == self.nb_candidates:
+                break
+        if best is None:
+            # everything is assigned
+            cubes.append(cube)
+            return
+        var = best[1]
+        for lit in (2 * var, 2 * var + 1):
+            if self.assume(lit):
+                self.split(cube + [lit], depth - 1, cubes)
+                trail.backtrack(trail.level - 1)
+            else:
+                self.stats.nb_refuted_cubes += 1
+
+
+# solver of a worker of the pool
+_solver = None
+
+
+def init(path, config):
+    global _solver
+    _solver = parse_cnf(path, **config)
+
+
+def conquer(task):
+    """
+    solves the formula of the worker under the cube
+    with at most budget conflicts
+
+    returns (cube, model, conflicts) where model is None
+    if the budget was not enough
+    """
+    cube, budget = task
+    variables = _solver.variables
+    conflicts = _solver.stats.nb_conflicts
+    model = _solver.solve([types.Literal.decode(lit, variables)
+                           for lit in cube], budget)
+    if model:
+        model = [var.value for var in variables.by_index]
+    return cube, model, _solver.stats.nb_conflicts - conflicts
+
+
+def solve(path, jobs=2, depth=None, candidates=30, budget=1000, **kwargs):
+    """
+    solves the DIMACS file path by cube-and-conquer,
+    the cubes are split up to depth (by default enough
+    for 4 cubes per job) and solved by jobs processes
+
+    the cubes are solved in rounds, with at most budget
+    conflicts each, the budget doubles after each round
+    so that a hard cube cannot delay the other ones
+
+    kwargs are passed to the Solver
+
+    returns (model, stats), model is False if the formula is unsat,
+    or the list of the values of the variables (var1 is model[0]),
+    the pool is terminated as soon as a cube is satisfiable
+    """
+    if kwargs.get('trace') is not None or kwargs.get('cache') is not None:
+        raise ValueError('the workers cannot share a trace or a cache')
+    if depth is None:
+        depth = (4 * jobs - 1).bit_length()
+    solver = parse_cnf(path, **kwargs)
+    stats = solver.stats
+    if not solver.preprocessed:
+        solver.preprocess()
+    cubes = Lookahead(solver, candidates).cubes(depth)
+    model = False
+    dbt = time()
+    context = multiprocessing.get_context()
+    with context.Pool(jobs, init, (path, kwargs)) as pool:
+        while cubes and not model:
+            tasks = [(cube, budget) for cube in cubes]
+            cubes = []
+            for cube, model, conflicts in pool.imap_unordered(conquer,
+                                                              tasks):
+                stats.nb_conflicts += conflicts
+                if model is None:
+                    cubes.append(cube)
+                    continue
+                stats.nb_solved_cubes += 1
+                if model:
+                    # leaving the with block terminates the pool
+                    break
+            budget *= 2
+            stats.nb_rounds += 1
+        model = model or False
+    stats.time_conquer += time() - dbt
+    return model, stats
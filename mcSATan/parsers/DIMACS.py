@@ -1,32 +1,133 @@
 #!/usr/bin/env python3
 
+import bz2
+import gzip
+import lzma
+import re
+import sys
+from array import array
+from time import time
+
 from mcSATan.core import Solver
 
+# decompressors by file extension
+openers = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+# comment and problem lines (and the '%' end marker of some benchmarks)
+_skip = re.compile(rb'^[ \t]*[cp%].*$', re.M)
+_header = re.compile(rb'^[ \t]*p[ \t]+cnf[ \t]+(\d+)[ \t]+(\d+)', re.M)
+
+CHUNK = 1 << 24
+
+
+def open_cnf(path):
+    """
+    opens a DIMACS file in binary mode,
+    decompressing it according to its extension
+    '-' is the standard input
+    """
+    if path == '-':
+        return sys.stdin.buffer
+    for ext, opener in openers.items():
+        if path.endswith(ext):
+            return opener(path, 'rb')
+    return open(path, 'rb')
+
+
+def read_cnf(infile, chunk=CHUNK):
+    """
+    tokenizes a DIMACS file by chunks of bytes
 
-def parse_cnf(infile):
-    solver = Solver(CDCL=True)
-    buf = []
-    nClauses = float('inf')
-    for line in infile:
-        if not nClauses:
+    infile is a file object (binary or text)
+    returns (nVar, nClauses, ints, size) where ints is an
+    array of all the integers of the clauses, each clause
+    being terminated by a 0, and size is the number of bytes read
+    """
+    ints = array('i')
+    header = None
+    size = 0
+    rest = b''
+    while True:
+        data = infile.read(chunk)
+        if isinstance(data, str):
+            data = data.encode()
+        size += len(data)
+        if data:
+            # only tokenize complete lines
+            end = data.rfind(b'\n') + 1
+            if not end:
+                rest += data
+                continue
+            data, rest = rest + data[:end], data[end:]
+        else:
+            data, rest = rest, b''
+        if header is None:
+            header = _header.search(data)
+        ints.extend(map(int, _skip.sub(b'', data).split()))
+        if not rest and not data:
             break
-        line = line.split()
-        if line[0] == 'c':
-            continue
-        if line[0] == 'p':
-            assert line[1] == 'cnf'
-            nVar = int(line[2])
-            nClauses = int(line[3])
-            variables = {i: solver.BoolVar('var%s' % i)
-                         for i in range(1, nVar + 1)}
-            continue
-        *line, = map(int, line)
-        line = buf + line
-        buf = []
-        if line[-1] != 0:
-            buf = line
-            continue
-        nClauses -= 1
-        solver.Clause(*[solver.Literal(variables[abs(i)], i > 0)
-                        for i in line[:-1]])
+    if header is None:
+        raise ValueError('missing DIMACS header')
+    return int(header.group(1)), int(header.group(2)), ints, size
+
+
+def to_codes(ints, nVar, base=0):
+    """
+    converts DIMACS integers to literal codes of variables
+    numbered from base (see Literal.code)
+
+    returns the codes and the offsets of the clauses
+    (the clause i is codes[offsets[i]:offsets[i + 1]])
+    """
+    # DIMACS integer + nVar -> code, the terminating 0 -> -1
+    table = [2 * (base + nVar - i) - 1 for i in range(nVar)]
+    table.append(-1)
+    table.extend(2 * (base + i) for i in range(nVar))
+    codes = array('i', [table[i + nVar] for i in ints])
+    offsets = array('i', [0])
+    index = codes.index
+    start = 0
+    end = len(codes)
+    while start < end:
+        stop = index(-1, start)
+        offsets.append(stop - len(offsets) + 1)
+        start = stop + 1
+    # remove the terminating -1
+    codes = array('i', filter((-1).__ne__, codes))
+    return codes, offsets
+
+
+def parse_cnf(infile, **kwargs):
+    """
+    infile is a file object or a path (see open_cnf)
+
+    kwargs are passed to the Solver
+    parse_time (seconds) and parse_bytes
+    are recorded in the stats
+    """
+    dbt = time()
+    if isinstance(infile, str):
+        with open_cnf(infile) as f:
+            nVar, nClauses, ints, size = read_cnf(f)
+    else:
+        nVar, nClauses, ints, size = read_cnf(infile)
+    if ints and ints[-1]:
+        ints.append(0)
+    if ints and (max(ints) > nVar or -min(ints) > nVar):
+        raise ValueError('variable above %s' % nVar)
+    solver = Solver(CDCL=True, **kwargs)
+    base = len(solver.variables)
+    for i in range(1, nVar + 1):
+        solver.BoolVar('var%s' % i)
+    codes, offsets = to_codes(ints, nVar, base)
+    # what follows the last clause is ignored
+    del offsets[nClauses + 1:]
+    del codes[offsets[-1]:]
+    solver.add_clauses(codes, offsets)
+    solver.stats.parse_time = time() - dbt
+    solver.stats.parse_bytes = size
     return solver
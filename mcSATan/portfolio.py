@@ -0,0 +1,226 @@
+"""
+Portfolio: several solvers with different configurations
+run on the same formula in different processes,
+the first answer is returned
+
+The solvers share their short learned clauses
+through a ring buffer in shared memory.
+"""
+
+import multiprocessing
+import traceback
+from queue import Empty
+
+from .parsers.DIMACS import parse_cnf
+
+# seconds between two checks that the workers are alive
+POLL = .5
+
+
+class Stopped(Exception):
+    """
+    raised in a worker when another one has answered
+    """
+
+
+class Ring():
+    """
+    Ring buffer of clauses in shared memory
+
+    A clause is written as [sender, lbd, size, *lits] at head,
+    the total number of ints ever written. Each reader keeps
+    its own cursor, a reader that is more than capacity ints
+    late loses the clauses it did not read.
+    """
+
+    def __init__(self, capacity=1 << 20, context=multiprocessing):
+        self.capacity = capacity
+        self.data = context.RawArray('i', capacity)
+        self.head = context.RawValue('q', 0)
+        self.lock = context.Lock()
+
+    def write(self, sender, lbd, clause):
+        entry = [sender, lbd, len(clause)]
+        entry.extend(clause)
+        capacity = self.capacity
+        if len(entry) > capacity:
+            return
+        with self.lock:
+            start = self.head.value % capacity
+            end = start + len(entry)
+            if end <= capacity:
+                self.data[start:end] = entry
+            else:
+                split = capacity - start
+                self.data[start:] = entry[:split]
+                self.data[:end - capacity] = entry[split:]
+            self.head.value += len(entry)
+
+    def read(self, cursor):
+        """
+        returns the entries (sender, lbd, clause) written since cursor
+        and the new cursor
+        """
+        capacity = self.capacity
+        with self.lock:
+            head = self.head.value
+            if head - cursor > capacity:
+                # too late, the clauses were overwritten
+                return [], head
+            start, end = cursor % capacity, head % capacity
+            if start <= end and head - cursor < capacity:
+                data = self.data[start:end]
+            else:
+                data = self.data[start:] + self.data[:end]
+        entries = []
+        i = 0
+        while i < len(data):
+            sender, lbd, size = data[i:i + 3]
+            entries.append((sender, lbd, data[i + 3:i + 3 + size]))
+            i += 3 + size
+        return entries, head
+
+
+class Exchange():
+    """
+    Interface between a Solver and the Ring
+    (see Solver.exchange)
+
+    The learned clauses with at most max_size literals
+    and an LBD of at most max_lbd are shared.
+    """
+
+    def __init__(self, ring, stop, id, max_size=8, max_lbd=4):
+        self.ring = ring
+        self.stop = stop
+        self.id = id
+        self.max_size = max_size
+        self.max_lbd = max_lbd
+        self.cursor = ring.head.value
+        self.conflicts = 0
+
+    def export(self, clause, lbd):
+        """
+        called after each conflict with the learned clause
+        """
+        self.conflicts += 1
+        if not self.conflicts & 255 and self.stop.is_set():
+            raise Stopped
+        if len(clause) <= self.max_size and lbd <= self.max_lbd:
+            self.ring.write(self.id, lbd, clause)
+
+    def fetch(self):
+        """
+        returns the clauses (with their LBD)
+        learned by the other solvers since the last call
+        """
+        if self.stop.is_set():
+            raise Stopped
+        entries, self.cursor = self.ring.read(self.cursor)
+        return [(clause, lbd) for sender, lbd, clause in entries
+                if sender != self.id]
+
+
+def configs(jobs, seed=0, **kwargs):
+    """
+    jobs configurations of the Solver: the first one is kwargs,
+    the other ones also change the seed, the restart policy
+    and the phase policy
+
+    the preprocessing must be the same for all of them,
+    since the learned clauses are shared
+    """
+    restarts = ('luby', 'glucose', 'geometric')
+    ans = []
+    for i in range(jobs):
+        config = dict(kwargs)
+        if i:
+            config.update(seed=seed + i,
+                          restarts=restarts[i % len(restarts)],
+                          phase_saving=i % 4 != 3,
+                          rephase=1000 if i % 2 else 0)
+        ans.append(config)
+    return ans
+
+
+def worker(id, path, config, ring, stop, results):
+    try:
+        solver = parse_cnf(path, **config)
+        solver.exchange = Exchange(ring, stop, id)
+        model = solver.solve()
+    except Stopped:
+        return
+    except Exception:
+        results.put((id, None, None, traceback.format_exc()))
+        return
+    if model is not False:
+        model = [var.value for var in solver.variables.by_index]
+    results.put((id, model, dict(solver.stats), None))
+
+
+def solve(path, jobs=2, seed=0, timeout=1., **kwargs):
+    """
+    solves the DIMACS file path with jobs processes
+    (see configs for the other arguments)
+
+    returns (model, stats, config) of the first solver to answer,
+    model is False if the formula is unsat, or the list of the values
+    of the variables (var1 is model[0])
+
+    the other workers are stopped, and terminated
+    if they do not stop within timeout seconds
+
+    a worker that dies without an answer (killed by a signal...)
+    counts as a failed one
+    """
+    if kwargs.get('trace') is not None or kwargs.get('cache') is not None:
+        raise ValueError('the workers cannot share a trace or a cache')
+    context = multiprocessing.get_context()
+    ring = Ring(context=context)
+    stop = context.Event()
+    results = context.Queue()
+    todo = configs(jobs, seed, **kwargs)
+    processes = [context.Process(target=worker, daemon=True,
+                                 args=(id, path, config, ring, stop, results))
+                 for id, config in enumerate(todo)]
+    for process in processes:
+        process.start()
+    try:
+        errors = []
+        while True:
+            try:
+                id, model, stats, error = results.get(timeout=POLL)
+            except Empty:
+                # a worker that exits normally sends its answer first
+                dead = ['worker %s exited with code %s\n'
+                        % (i, process.exitcode)
+                        for i, process in enumerate(processes)
+                        if process.exitcode not in (None, 0)]
+                if len(errors) + len(dead) == len(processes):
+                    raise RuntimeError('all the workers failed\n' +
+                                       ''.join(errors + dead))
+                continue
+            if error is None:
+                break
+            errors.append(error)
+            if len(errors) == len(processes):
+                raise RuntimeError('all the workers failed\n' +
+                                   ''.join(errors))
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout)
+            # the results of the other workers must be consumed
+            # for them to exit
+            try:
+                while True:
+                    results.get_nowait()
+            except Empty:
+                pass
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+    stats['portfolio_worker'] = id
+    stats['portfolio_jobs'] = jobs
+    return model, stats, todo[id]
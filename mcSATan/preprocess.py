@@ -0,0 +1,372 @@
+from array import array
+from collections import deque
+from time import perf_counter
+
+from .types.clauses import DELETED, LEARNED
+from .watches import FLAGS, HEADER
+
+# names of the passes, in the order they are run
+PASSES = ('units', 'subsume', 'strengthen', 'eliminate')
+
+
+class Preprocessor():
+    """
+    Simplifies the original clauses of the ClauseDB
+    at level 0, before the search
+
+    The clauses are identified by an id: the original ones stay
+    in the arena and their id is their cref, the new ones are sets
+    with a negative id. A removed original clause is removed from
+    the ClauseDB at once. The occurrence lists literal -> ids are
+    arrays, the removed ids are dropped when they are read
+    (see occurrences), so that the preprocessing does not copy
+    the formula.
+
+    Passes:
+        - units: propagation of the unit clauses
+        - subsume: removal of duplicate and subsumed clauses
+        - strengthen: self-subsuming resolution
+        - eliminate: bounded variable elimination (SatELite),
+          the eliminated variables are not decided
+          and their values are computed by extend
+
+    If proof is set (see proof.Proof), the new clauses are written
+    as soon as they are derived, and the deletions when the changes
+    are committed. The clauses of the eliminated variables and the
+    unit clauses are not deleted from the proof, so that restore
+    does not have to justify them.
+
+    from "Effective Preprocessing in SAT through Variable
+    and Clause Elimination" by N. Eén and A. Biere
+    """
+
+    # no resolvent longer than that is added
+    resolvent_limit = 20
+    # variables with more occurrences are not eliminated
+    occurrence_limit = 40
+
+    def __init__(self, clauses, variables, trail, stats, passes=PASSES):
+        for name in passes:
+            if name not in PASSES:
+                raise ValueError('unknown pass %r' % name)
+        self.clauses = clauses
+        self.variables = variables
+        self.trail = trail
+        self.stats = stats
+        self.passes = passes
+        # (eliminated variable, clauses that contained it positively,
+        #  clauses that contained it negatively)
+        self.eliminated = []
+        self.eliminated_vars = set()
+        self.frozen_vars = set()
+        self.proof = None
+
+    def run(self, frozen=()):
+        """
+        runs the passes, the variables of frozen
+        are not eliminated
+
+        the new units and an empty clause if the formula
+        is unsat are added to the ClauseDB
+        """
+        self.frozen_vars = set(frozen)
+        clauses = self.clauses
+        arena = clauses.arena
+        # negative id -> set of literals
+        self.added = {}
+        self.occurs = occurs = [array('i') for _ in
+                                range(2 * len(self.variables))]
+        self.nb_removed = 0
+        # clauses to delete from the proof
+        self.deletions = []
+        self.next_id = -1
+        self.unsat = False
+        # literal -> value, as in the ClauseDB
+        self.value = bytearray(b'\1') * len(occurs)
+        self.pending = [lit for lit in self.trail.stack
+                        if self.variables.is_bool[lit >> 1]]
+        self.new_units = []
+        for cref in list(clauses.crefs()):
+            if arena[cref + FLAGS] & LEARNED:
+                continue
+            lits = clauses.literals(cref)
+            if not lits:
+                self.unsat = True
+                continue
+            if len({lit >> 1 for lit in lits}) < len(lits):
+                # tautology
+                self.remove(cref)
+                continue
+            for lit in lits:
+                occurs[lit].append(cref)
+            if len(lits) == 1:
+                self.pending.append(lits[0])
+
+        for name in self.passes:
+            if self.unsat:
+                break
+            dbt = perf_counter()
+            getattr(self, name)()
+            self.stats['time_preprocess_' + name] += perf_counter() - dbt
+        self.commit()
+        return not self.unsat
+
+    def commit(self):
+        """
+        writes the new clauses to the ClauseDB
+        """
+        clauses = self.clauses
+        for clause in self.added.values():
+            clauses.add(sorted(clause))
+        for lit in self.new_units:
+            clauses.add([lit])
+        if self.unsat:
+            clauses.add([])
+        if self.proof is not None:
+            for clause in self.deletions:
+                self.proof.delete(sorted(clause))
+        pq = self.variables.pq
+        for var, _, _ in self.eliminated:
+            pq.remove(var)
+        clauses.gc(self.trail.reason)
+        self.stats.nb_preprocess_removed_clauses += self.nb_removed
+        # only the eliminated clauses are kept
+        del self.added, self.occurs, self.deletions
+
+    def alive(self, id):
+        if id < 0:
+            return id in self.added
+        return not self.clauses.arena[id + FLAGS] & DELETED
+
+    def literals(self, id):
+        if id < 0:
+            return self.added[id]
+        arena = self.clauses.arena
+        return arena[id + HEADER:id + HEADER + arena[id]]
+
+    def size(self, id):
+        if id < 0:
+            return len(self.added[id])
+        return self.clauses.arena[id]
+
+    def ids(self):
+        """
+        ids of the clauses, the shortest first
+        """
+        arena = self.clauses.arena
+        ids = [cref for cref in self.clauses.crefs()
+               if not arena[cref + FLAGS] & LEARNED]
+        ids.extend(self.added)
+        ids.sort(key=self.size)
+        return ids
+
+    def occurrences(self, lit):
+        """
+        ids of the clauses that contain lit
+        (the removed ones are dropped from the occurrence list)
+        """
+        ids = self.occurs[lit]
+        added = self.added
+        arena = self.clauses.arena
+        live = [id for id in ids if (id in added if id < 0 else
+                                     not arena[id + FLAGS] & DELETED)]
+        if len(live) < len(ids):
+            self.occurs[lit] = array('i', live)
+        return live
+
+    def add(self, clause):
+        """
+        adds a new clause (set of literals)
+        """
+        if not clause:
+            self.unsat = True
+            return
+        if len(clause) == 1:
+            self.pending.append(next(iter(clause)))
+        if self.proof is not None:
+            self.proof.add(sorted(clause))
+        id = self.next_id
+        self.next_id -= 1
+        self.added[id] = clause
+        for lit in clause:
+            self.occurs[lit].append(id)
+
+    def remove(self, id, proof=True):
+        """
+        removes a clause, and deletes it from the proof
+        unless proof is False
+        """
+        if id < 0:
+            clause = self.added.pop(id)
+        else:
+            clause = self.clauses.literals(id)
+            self.clauses.remove(id, proof=False)
+            self.nb_removed += 1
+        if proof and self.proof is not None and len(clause) > 1:
+            self.deletions.append(clause)
+
+    def replace(self, id, clause):
+        self.remove(id)
+        self.add(clause)
+
+    def units(self):
+        """
+        removes the satisfied clauses and the false literals
+        """
+        value = self.value
+        pending = self.pending
+        while pending and not self.unsat:
+            lit = pending.pop()
+            if value[lit] == 2:
+                continue
+            if not value[lit]:
+                self.unsat = True
+                return
+            value[lit] = 2
+            value[lit ^ 1] = 0
+            if self.trail.lvl[lit >> 1] < 0:
+                self.new_units.append(lit)
+                self.stats.nb_preprocess_units += 1
+            elif self.proof is not None:
+                # the reason of lit may be deleted
+                self.proof.add([lit])
+            for id in self.occurrences(lit):
+                self.remove(id)
+            for id in self.occurrences(lit ^ 1):
+                self.replace(id, frozenset(self.literals(id)) - {lit ^ 1})
+
+    def subsume(self):
+        """
+        removes the clauses that contain another one
+        """
+        occurs = self.occurs
+        for id in self.ids():
+            if not self.alive(id):
+                continue
+            clause = self.literals(id)
+            best = min(clause, key=lambda lit: len(occurs[lit]))
+            # the clauses that contain best and the other literals
+            others = set(occurs[best]).intersection(
+                *[occurs[lit] for lit in clause if lit != best])
+            others.discard(id)
+            for other in sorted(filter(self.alive, others)):
+                self.remove(other)
+                self.stats.nb_subsumed_clauses += 1
+
+    def strengthen(self):
+        """
+        self-subsuming resolution: if the clause minus lit
+        is contained in a clause with the negation of lit,
+        the negation can be removed from the latter
+        """
+        occurs = self.occurs
+        queue = deque(self.ids())
+        while queue and not self.unsat:
+            id = queue.popleft()
+            if not self.alive(id):
+                continue
+            clause = self.literals(id)
+            for lit in clause:
+                # the clauses that contain the negation of lit
+                # and the other literals
+                others = set(occurs[lit ^ 1]).intersection(
+                    *[occurs[other] for other in clause if other != lit])
+                for other in sorted(filter(self.alive, others)):
+                    self.replace(other,
+                                 frozenset(self.literals(other)) - {lit ^ 1})
+                    self.stats.nb_strengthened_clauses += 1
+                    queue.append(self.next_id + 1)
+            if 'units' in self.passes:
+                self.units()
+
+    def resolvents(self, var, pos, neg):
+        """
+        non tautological resolvents of the clauses pos and neg on var
+        None if there are more than len(pos) + len(neg)
+        or if one of them is too long
+        """
+        ans = []
+        bound = len(pos) + len(neg)
+        for p in pos:
+            p = p - {2 * var}
+            for n in neg:
+                resolvent = p | (n - {2 * var + 1})
+                if any(lit ^ 1 in resolvent for lit in p):
+                    continue
+                if (len(ans) == bound or
+                        len(resolvent) > self.resolvent_limit):
+                    return None
+                ans.append(resolvent)
+        return ans
+
+    def frozen(self, var):
+        """
+        variables that cannot be eliminated
+        """
+        variables = self.variables
+        return (not variables.is_bool[var] or
+                var in variables.watches.in_watch or
+                var in self.frozen_vars or
+                self.trail.lvl[var] >= 0 or
+                self.value[2 * var] != 1)
+
+    def eliminate(self):
+        """
+        bounded variable elimination: replaces the clauses
+        of a variable by their resolvents if there are not more of them
+        """
+        occurrences = self.occurrences
+        order = sorted(range(len(self.occurs) // 2),
+                       key=lambda var: len(occurrences(2 * var)) *
+                       len(occurrences(2 * var + 1)))
+        for var in order:
+            if self.unsat:
+                break
+            pos, neg = occurrences(2 * var), occurrences(2 * var + 1)
+            if (not pos and not neg or self.frozen(var) or
+                    len(pos) + len(neg) > self.occurrence_limit):
+                continue
+            pos = {id: frozenset(self.literals(id)) for id in pos}
+            neg = {id: frozenset(self.literals(id)) for id in neg}
+            resolvents = self.resolvents(var, list(pos.values()),
+                                         list(neg.values()))
+            if resolvents is None:
+                continue
+            self.eliminated.append((var, list(pos.values()),
+                                    list(neg.values())))
+            self.eliminated_vars.add(var)
+            for id in [*pos, *neg]:
+                self.remove(id, proof=False)
+            for resolvent in resolvents:
+                self.add(resolvent)
+            self.stats.nb_eliminated_vars += 1
+            if 'units' in self.passes:
+                self.units()
+
+    def extend(self, values):
+        """
+        computes the values of the eliminated variables
+        from the values of the other ones
+        values is a bytearray literal -> value (see ClauseDB)
+        """
+        for var, pos, _ in reversed(self.eliminated):
+            lit = 2 * var
+            val = any(all(values[other] == 0 for other in clause
+                          if other != lit) for clause in pos)
+            values[lit] = 2 if val else 0
+            values[lit ^ 1] = 0 if val else 2
+
+    def restore(self, var):
+        """
+        reintroduces the eliminated variable var:
+        it can be decided again and its clauses are returned,
+        they must be added back to the ClauseDB
+        """
+        for i, (other, pos, neg) in enumerate(self.eliminated):
+            if other == var:
+                break
+        del self.eliminated[i]
+        self.eliminated_vars.discard(var)
+        self.variables.pq.push(var, self.variables.key(var))
+        self.stats.nb_restored_vars += 1
+        return pos + neg
@@ -0,0 +1,196 @@
+"""
+DRAT and LRAT proofs of unsatisfiability
+
+A Solver created with proof=path (or a Proof) writes every clause
+it derives (learned clauses, clauses of the preprocessing) and every
+clause it deletes, so that an UNSAT answer can be checked by
+drat-trim (DRAT) or by an LRAT checker such as cake_lpr.
+The proof ends with the empty clause.
+
+The binary formats encode each literal (and each LRAT clause id)
+as a variable-length unsigned integer, see
+https://github.com/marijnheule/drat-trim#binary-drat-format
+"""
+
+import queue
+import threading
+from time import perf_counter
+
+from .types.clauses import dimacs
+
+
+def encode(nums, out):
+    """
+    appends the variable-length encodings
+    of the non negative ints nums to the bytearray out
+    """
+    for u in nums:
+        while u > 127:
+            out.append(u & 127 | 128)
+            u >>= 7
+        out.append(u)
+
+
+class Proof():
+    """
+    Buffered writer of a proof
+
+    The clauses are lists of literal codes (see Literal.code),
+    written as DIMACS literals (the variables are numbered from 1
+    in the order of the VarDB).
+
+    In LRAT, the clauses are identified by the order in which
+    they were added to the ClauseDB (the original clauses first)
+    and each lemma has hints: the ids of the clauses that
+    become unit (and then false) under its negation
+    (see lrat_hints).
+
+    The encoded proof is buffered, the buffer is written
+    when it is larger than buffer bytes, by a background thread
+    if thread is True.
+    """
+
+    def __init__(self, path, lrat=False, binary=True, thread=False,
+                 buffer=1 << 20):
+        self.file = open(path, 'wb')
+        self.lrat = lrat
+        self.binary = binary
+        self.buffer = bytearray()
+        self.buffer_size = buffer
+        # id of the last added clause (LRAT)
+        self.last_id = 0
+        self.nb_additions = 0
+        self.nb_deletions = 0
+        self.bytes = 0
+        # time spent encoding and writing
+        self.time = 0.
+        self.queue = None
+        if thread:
+            self.queue = queue.Queue(maxsize=8)
+            self.thread = threading.Thread(target=self.writer, daemon=True)
+            self.thread.start()
+
+    def add(self, lits, id=None, hints=()):
+        """
+        writes the clause lits, derived from the previous ones
+        (id and hints are only used by LRAT)
+        """
+        dbt = perf_counter()
+        out = self.buffer
+        if self.lrat:
+            self.last_id = id
+            if self.binary:
+                out.append(97)  # 'a'
+                encode((2 * id,), out)
+                encode([lit + 2 for lit in lits], out)
+                out.append(0)
+                encode([2 * hint for hint in hints], out)
+                out.append(0)
+            else:
+                out += ('%s %s0 %s0\n' % (
+                    id, ''.join('%s ' % dimacs(lit) for lit in lits),
+                    ''.join('%s ' % hint for hint in hints))).encode()
+        elif self.binary:
+            out.append(97)  # 'a'
+            encode([lit + 2 for lit in lits], out)
+            out.append(0)
+        else:
+            out += (''.join('%s ' % dimacs(lit) for lit in lits) +
+                    '0\n').encode()
+        self.nb_additions += 1
+        if len(out) > self.buffer_size:
+            self.write_buffer()
+        self.time += perf_counter() - dbt
+
+    def delete(self, lits, id=None):
+        """
+        writes the deletion of the clause lits
+        (whose id is only used by LRAT)
+        """
+        dbt = perf_counter()
+        out = self.buffer
+        if self.lrat:
+            if self.binary:
+                out.append(100)  # 'd'
+                encode((2 * id,), out)
+                out.append(0)
+            else:
+                out += ('%s d %s 0\n' % (self.last_id, id)).encode()
+        elif self.binary:
+            out.append(100)  # 'd'
+            encode([lit + 2 for lit in lits], out)
+            out.append(0)
+        else:
+            out += ('d ' + ''.join('%s ' % dimacs(lit) for lit in lits) +
+                    '0\n').encode()
+        self.nb_deletions += 1
+        if len(out) > self.buffer_size:
+            self.write_buffer()
+        self.time += perf_counter() - dbt
+
+    def writer(self):
+        """
+        loop of the background thread
+        """
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                self.queue.task_done()
+                return
+            self.file.write(chunk)
+            self.queue.task_done()
+
+    def write_buffer(self):
+        chunk = bytes(self.buffer)
+        self.buffer.clear()
+        self.bytes += len(chunk)
+        if self.queue is None:
+            self.file.write(chunk)
+        else:
+            self.queue.put(chunk)
+
+    def flush(self):
+        """
+        writes everything to the file
+        """
+        dbt = perf_counter()
+        self.write_buffer()
+        if self.queue is not None:
+            self.queue.join()
+        self.file.flush()
+        self.time += perf_counter() - dbt
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        if self.queue is not None:
+            self.queue.put(None)
+            self.thread.join()
+        self.file.close()
+
+
+def lrat_hints(trail, cref, clause):
+    """
+    LRAT hints of the clause learned from the conflict clause cref,
+    before backtracking: the reasons of the variables that were
+    resolved (during the analysis, the minimization or at level 0)
+    in the order of the trail, then the conflict clause
+    """
+    clauses = trail.clauses
+    ids = clauses.ids
+    literals = clauses.literals
+    reason = trail.reason
+    stop = {lit >> 1 for lit in clause}
+    needed = set()
+    todo = [cref]
+    while todo:
+        for lit in literals(todo.pop()):
+            var = lit >> 1
+            if var not in stop and var not in needed:
+                needed.add(var)
+                todo.append(reason[var])
+    hints = [ids[reason[lit >> 1]] for lit in trail.stack
+             if lit >> 1 in needed]
+    hints.append(ids[cref])
+    return hints
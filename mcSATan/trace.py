@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+"""
+Event trace of the search
+
+A Solver created with trace=path writes the events of its search
+(decisions, propagations, conflicts, learned clauses, backtracks,
+restarts...) to path in a binary format: MAGIC, then for each event
+its code (1 byte), its number n of arguments and the n arguments
+(little endian int32).
+
+The events are written by TracedTrail, which replaces the Trail,
+so that a Solver without trace pays nothing for it.
+TracedTrail also checks the invariants of the Trail.
+
+    python3 -m mcSATan.trace file.trace [--at CONFLICT]
+
+pretty-prints a trace, or the trail at a conflict (see Replay).
+"""
+
+import argparse
+import struct
+import sys
+from array import array
+
+from .core import Conflict, Trail
+from .types.clauses import dimacs
+from .types.vars import VarDB
+
+MAGIC = b'mcSATan trace 1\n'
+RECORD = struct.Struct('<Bi')
+
+EVENTS = ('SOLVE', 'RESULT', 'DECIDE', 'ASSIGN', 'CONFLICT', 'LEARN',
+          'BACKTRACK', 'RESTART', 'REDUCE', 'REPHASE')
+(SOLVE, RESULT, DECIDE, ASSIGN, CONFLICT, LEARN,
+ BACKTRACK, RESTART, REDUCE, REPHASE) = range(len(EVENTS))
+
+# arguments of RESULT
+UNSAT, SAT, UNKNOWN = range(3)
+
+
+class Trace():
+    """
+    Writer of a trace file
+
+    The arguments of the events are:
+        SOLVE: the assumptions
+        RESULT: UNSAT, SAT or UNKNOWN
+        DECIDE: the literal (none for an empty level)
+        ASSIGN: the propagated literals and their reasons, interleaved
+        CONFLICT: the conflict clause
+        LEARN: the backjump level, the LBD and the learned clause
+        BACKTRACK: the level
+        RESTART: none
+        REDUCE: the number of learned clauses kept
+        REPHASE: the index in VarDB.rephase_cycle
+    where the literals are codes (see Literal.code)
+    and the clauses references in the ClauseDB
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+
+    def write(self, event, args=()):
+        args = array('i', args)
+        if sys.byteorder == 'big':
+            args.byteswap()
+        self.file.write(RECORD.pack(event, len(args)))
+        self.file.write(args.tobytes())
+
+    # events of the Solver
+
+    def solve(self, assumptions):
+        self.write(SOLVE, assumptions)
+
+    def result(self, ans):
+        self.write(RESULT, (UNKNOWN if ans is None else
+                            UNSAT if ans is False else SAT,))
+        self.flush()
+
+    def restart(self):
+        self.write(RESTART)
+
+    def reduce(self, nb_learned):
+        self.write(REDUCE, (nb_learned,))
+
+    def rephase(self, index):
+        self.write(REPHASE, (index,))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class TracedTrail(Trail):
+    """
+    Trail that writes its events to a Trace
+
+    The assignments are written in bulk (ASSIGN) before
+    the next decision, backtrack or conflict and
+    after each propagation.
+    """
+
+    def __init__(self, trace, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.trace = trace
+        # size of the stack already written
+        self.traced = 0
+
+    def write_assignments(self):
+        stack = self.stack
+        if self.traced < len(stack):
+            reason = self.reason
+            args = []
+            for lit in stack[self.traced:]:
+                args += lit, reason[lit >> 1]
+            self.trace.write(ASSIGN, args)
+            self.traced = len(stack)
+
+    def backtrack(self, lvl):
+        if lvl >= self.level:
+            return
+        self.write_assignments()
+        super().backtrack(lvl)
+        self.trace.write(BACKTRACK, (lvl,))
+        self.traced = len(self.stack)
+
+    def decide(self, var, val):
+        assert not self.has_value(var), var
+        self.write_assignments()
+        super().decide(var, val)
+        self.trace.write(DECIDE, (2 * var + (not val),))
+        self.traced = len(self.stack)
+
+    def new_level(self):
+        self.write_assignments()
+        super().new_level()
+        self.trace.write(DECIDE)
+
+    def clausal_propagate(self, clause, lit):
+        assert self.variables.is_bool[lit >> 1], lit
+        super().clausal_propagate(clause, lit)
+
+    def propagate(self):
+        try:
+            ans = super().propagate()
+        except Conflict as conflict:
+            self.write_assignments()
+            self.trace.write(CONFLICT, (conflict.clause,))
+            raise
+        self.write_assignments()
+        return ans
+
+    def backtrack_with(self, clause, lvl, type, learn=True, lbd=0):
+        self.trace.write(LEARN, [lvl, lbd, *clause])
+        super().backtrack_with(clause, lvl, type, learn, lbd)
+
+
+def read(path):
+    """
+    yields the events (code, arguments) of a trace file,
+    a truncated trace ends at its last complete event
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('%s is not a trace' % path)
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                return
+            event, n = RECORD.unpack(head)
+            data = f.read(4 * n)
+            if len(data) < 4 * n:
+                return
+            args = array('i')
+            args.frombytes(data)
+            if sys.byteorder == 'big':
+                args.byteswap()
+            yield event, args
+
+
+class Replay():
+    """
+    Rebuilds the trail of a trace, event by event
+
+    stack is the list of the assignments (lit, reason, level),
+    lim[l] is the start of the level l + 1 in the stack
+    """
+
+    def __init__(self):
+        self.stack = []
+        self.lim = []
+        self.level = 0
+        self.conflicts = 0
+
+    def apply(self, event, args):
+        if event == DECIDE:
+            self.lim.append(len(self.stack))
+            self.level += 1
+            for lit in args:
+                self.stack.append((lit, Trail.DECISION, self.level))
+        elif event == ASSIGN:
+            self.stack.extend((args[i], args[i + 1], self.level)
+                              for i in range(0, len(args), 2))
+        elif event == BACKTRACK:
+            lvl = args[0]
+            del self.stack[self.lim[lvl]:]
+            del self.lim[lvl:]
+            self.level = lvl
+        elif event == CONFLICT:
+            self.conflicts += 1
+
+
+def reason(cref):
+    if cref == Trail.DECISION:
+        return 'decision'
+    if cref == Trail.SEMANTIC:
+        return 'semantic'
+    return '#%s' % cref
+
+
+def describe(event, args):
+    """
+    text of an event
+    """
+    name = EVENTS[event]
+    if event in (SOLVE, DECIDE):
+        return ' '.join([name, *map(str, map(dimacs, args))])
+    if event == ASSIGN:
+        return name + ' ' + ', '.join(
+            '%s <- %s' % (dimacs(args[i]), reason(args[i + 1]))
+            for i in range(0, len(args), 2))
+    if event == RESULT:
+        return '%s %s' % (name, ('UNSAT', 'SAT', 'UNKNOWN')[args[0]])
+    if event == CONFLICT:
+        return '%s %s' % (name, reason(args[0]))
+    if event == LEARN:
+        return '%s %s backjump %s lbd %s' % (
+            name, ' '.join(map(str, map(dimacs, args[2:]))), *args[:2])
+    if event == REPHASE:
+        cycle = VarDB.rephase_cycle
+        return '%s %s' % (name, cycle[args[0] % len(cycle)])
+    return ' '.join([name, *map(str, args)])
+
+
+parser = argparse.ArgumentParser(description='Pretty-prints a trace')
+parser.add_argument('path', help='trace file')
+parser.add_argument('--at', type=int, default=None,
+                    help='prints the trail at this conflict instead')
+
+
+def main(argv=None):
+    args = parser.parse_args(argv)
+    replay = Replay()
+    for event, event_args in read(args.path):
+        replay.apply(event, event_args)
+        if args.at is None:
+            print('%3d  %s' % (replay.level, describe(event, event_args)))
+        elif event == CONFLICT and replay.conflicts == args.at:
+            for lit, cref, level in replay.stack:
+                print('%3d  %s <- %s' % (level, dimacs(lit), reason(cref)))
+            print('CONFLICT %s' % reason(event_args[0]))
+            return
+    if args.at is not None:
+        sys.exit('only %s conflicts' % replay.conflicts)
+
+
+if __name__ == '__main__':
+    main()
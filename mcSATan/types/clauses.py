@@ -1,18 +1,38 @@
 from collections import namedtuple
+from array import array
 
-from ..watches import Watches
-from .. import logger
+from ..watches import Watches, Watches2WL, HEADER, FLAGS, LBD, ACTIVITY
+
+# flags of a clause in the arena
+LEARNED = 1
+DELETED = 2
 
 
 class Literal(namedtuple('Literal', 'atom bool')):
     """
     atom or negation of an atom
+
+    Only used at the Solver API boundary,
+    the core uses the integer code 2 * index + sign
+    where sign is 1 for a negation,
+    so that the negation of a code is code ^ 1.
     """
 
     @property
     def neg(self):
         return Literal(self.atom, not self.bool)
 
+    @property
+    def code(self):
+        return 2 * self.atom.index + (not self.bool)
+
+    @classmethod
+    def decode(cls, code, variables):
+        """
+        inverse of code, variables is the VarDB
+        """
+        return cls(variables.by_index[code >> 1], not code & 1)
+
     # not useful because it will be hashed
     # for the BCP
     # if not hasattr(self, '_neg'):
@@ -30,11 +50,20 @@ class Literal(namedtuple('Literal', 'atom bool')):
     #     return [self] + self.vars()
 
 
+def dimacs(lit):
+    """
+    DIMACS literal of a literal code
+    (variables are numbered from 1 in the order of the VarDB)
+    """
+    return -(lit >> 1) - 1 if lit & 1 else (lit >> 1) + 1
+
+
 class Clause(tuple):
     """
     Disjunction of literals
+
+    The ClauseDB stores clauses of literal codes
     """
-    # TODO: make unsafe clauses for analyse_conflict
     # TODO: ensure clause does not contain a literal and its negation
     def __new__(cls, *args):
         seen = set()
@@ -52,22 +81,6 @@ class Clause(tuple):
     def watches(self):
         return self
 
-    @staticmethod
-    def resolveB(clause1, clause2, lit):
-        # merging doesn't improve the
-        # performances
-        clause = list(clause1 + clause2)
-        clause.remove(lit)
-        clause.remove(lit.neg)
-        ans = Clause(*clause)
-
-        logger.debug('resolveB:\n'
-                     '\tclause1: %s\n'
-                     '\tclause2: %s\n'
-                     '\tans: %s',
-                     clause1, clause2, ans)
-        return ans
-
     def __repr__(self):
         return 'Clause%s' % super().__repr__()
 
@@ -78,46 +91,268 @@ class ClauseDB():
 
     Handles:
         - BCP
+        - storage of the clauses in the arena
+
+    The clauses are made of literal codes
+    (see Literal.code).
+
+    All the clauses are stored contiguously in an array, the arena,
+    and are referenced by their offset in it (cref).
+    A clause is a header of HEADER ints (see SIZE, FLAGS, LBD
+    and ACTIVITY) followed by its literals.
+    Removed clauses stay in the arena until gc compacts it.
+
+    The learned clauses are forgotten by reduce.
+
+    If proof is set (see proof.Proof), the removed clauses
+    are written to it, and for LRAT ids maps each cref to the
+    number of clauses added before it, plus one.
     """
-    # TODO: clause forget
 
-    def __init__(self, stats):
+    def __init__(self, stats, engine='2wl'):
         self.stats = stats
+        self.arena = array('i')
+        # number of ints of the removed clauses
+        self.wasted = 0
         # this instances of Watches is unique for the
         # clausal propagations
         # Literal assigned to False -> 0
         # Literal not assigned -> 1
         # Literal assigned to True -> 2
         # This way, a clause is unit iff its total is 1
-        self.watches = Watches()
+        # '2wl' is the default, 'counting' is the historical
+        # engine, kept for comparison
+        if engine == '2wl':
+            self.watches = Watches2WL(self.arena)
+        elif engine == 'counting':
+            self.watches = Watches()
+        else:
+            raise ValueError('unknown engine %r' % engine)
+        # literal code -> value
+        self.values = self.watches.values
+        # added clauses that were unit or unsat
+        self.pending = []
+        # number of learned clauses that are not removed
+        self.nb_learned = 0
+        self.proof = None
+        # cref -> LRAT id (None without LRAT)
+        self.ids = None
+        self.nb_ids = 0
+
+    def add_var(self):
+        """
+        registers the two literals of a new Bool variable
+        """
+        self.watches.add_var()
+        self.watches.add_var()
 
-    def add(self, clause):
+    def add(self, lits, learned=False, lbd=0, watch=True):
         """
         Add the clause to the database,
         and watches all its literals
+        returns its reference
+
+        the order of lits is the order of preference
+        for the watched literals (used by 2WL)
+
+        if watch is False, the clause is not watched
+        and is removed as soon as it is not a reason
+        """
+        cref = len(self.arena)
+        flags = LEARNED if learned else 0
+        if not watch:
+            flags |= DELETED
+            self.wasted += HEADER + len(lits)
+        self.arena.extend((len(lits), flags, lbd, 0))
+        self.arena.extend(lits)
+        if self.ids is not None:
+            self.nb_ids += 1
+            self.ids[cref] = self.nb_ids
+        if watch:
+            if learned:
+                self.nb_learned += 1
+            self.watches.add_watch(cref, lits)
+            values = self.values
+            # two literals that are not False are enough
+            if len(lits) > 1 and values[lits[0]] and values[lits[1]]:
+                return cref
+            if 2 not in map(values.__getitem__, lits) and sum(
+                    values[lit] for lit in lits) <= 1:
+                self.pending.append(cref)
+        return cref
+
+    def add_clauses(self, lits, offsets):
+        """
+        adds the original clauses lits[offsets[i]:offsets[i + 1]]
+        where lits is an array of codes, without creating
+        a Clause for each of them
+
+        the duplicate literals are removed
         """
-        self.watches.add_watch(clause)
+        add = self.add
+        start = offsets[0]
+        for end in offsets[1:]:
+            clause = lits[start:end]
+            if len(set(clause)) < end - start:
+                clause = array('i', dict.fromkeys(clause))
+            add(clause)
+            start = end
 
-    def unit_clauses(self):
+    def take_pending(self):
         """
-        return the unit clauses along with
-        the literal that makes them unit
+        returns and forgets the clauses that were unit
+        or unsat when they were added
         """
-        for clause, lit in self.watches.units():
-            assert isinstance(clause, Clause)
-            assert isinstance(lit, Literal)
-            yield clause, lit
+        pending, self.pending = self.pending, []
+        return pending
 
-    def unsat_clauses(self):
-        yield from self.watches.zeros()
+    def literals(self, cref):
+        start = cref + HEADER
+        return self.arena[start:start + self.arena[cref]]
+
+    def crefs(self):
+        """
+        iterates over the references of the clauses
+        that were not removed
+        """
+        arena = self.arena
+        cref = 0
+        end = len(arena)
+        while cref < end:
+            if not arena[cref + FLAGS] & DELETED:
+                yield cref
+            cref += HEADER + arena[cref]
+
+    def remove(self, cref, proof=True):
+        """
+        unwatches the clause and marks it as deleted,
+        and writes its deletion to the proof unless proof is False
+
+        the clause can still be the reason of an assignment
+        """
+        self.watches.remove(cref, self.literals(cref))
+        if proof and self.proof is not None:
+            self.proof.delete(self.literals(cref), None if self.ids is None
+                              else self.ids[cref])
+        if self.arena[cref + FLAGS] & LEARNED:
+            self.nb_learned -= 1
+        self.arena[cref + FLAGS] |= DELETED
+        self.wasted += HEADER + self.arena[cref]
+
+    def bump(self, cref):
+        """
+        increases the activity of a clause
+        used in a conflict analysis
+        """
+        self.arena[cref + ACTIVITY] += 1
+
+    # sort keys of the learned clauses for reduce, the worst first
+    reduce_keys = {
+        'lbd': lambda arena, cref: (-arena[cref + LBD],
+                                    arena[cref + ACTIVITY]),
+        'activity': lambda arena, cref: (arena[cref + ACTIVITY],
+                                         -arena[cref + LBD]),
+    }
+
+    def reduce(self, reason, policy='lbd', fraction=.5, glue=2):
+        """
+        removes the worst fraction of the learned clauses
+        that are not reasons and whose LBD is above glue,
+        according to the policy (see reduce_keys)
+        then halves the activities of the remaining ones
+
+        returns the number of removed clauses
+        """
+        arena = self.arena
+        locked = set(reason)
+        candidates = [cref for cref in self.crefs()
+                      if arena[cref + FLAGS] & LEARNED and
+                      arena[cref + LBD] > glue and cref not in locked]
+        key = self.reduce_keys[policy]
+        candidates.sort(key=lambda cref: key(arena, cref))
+        removed = int(len(candidates) * fraction)
+        for cref in candidates[:removed]:
+            self.remove(cref)
+        for cref in candidates[removed:]:
+            arena[cref + ACTIVITY] >>= 1
+        self.stats.nb_reductions += 1
+        self.stats.nb_deleted_clauses += removed
+        return removed
+
+    def simplify(self, reason):
+        """
+        at level 0, removes the clauses satisfied
+        by a literal, except the reasons
+        """
+        values = self.values
+        locked = set(reason)
+        for cref in list(self.crefs()):
+            if cref not in locked and 2 in map(values.__getitem__,
+                                                 self.literals(cref)):
+                self.remove(cref)
+                self.stats.nb_removed_clauses += 1
+
+    def gc(self, reason, force=False):
+        """
+        compacts the arena if enough of it is wasted
+        (or if force is True)
+        and relocates the watches and the reasons
+
+        reason is the array var -> cref of the Trail
+        (negative values are not references)
+        """
+        arena = self.arena
+        if not force and self.wasted <= len(arena) * self.garbage_frac:
+            return
+        locked = set(reason)
+        remap = {}
+        new = cref = 0
+        end = len(arena)
+        self.wasted = 0
+        while cref < end:
+            nxt = cref + HEADER + arena[cref]
+            if arena[cref + FLAGS] & DELETED:
+                if cref not in locked:
+                    cref = nxt
+                    continue
+                self.wasted += nxt - cref
+            remap[cref] = new
+            if new != cref:
+                arena[new:new + nxt - cref] = arena[cref:nxt]
+            new += nxt - cref
+            cref = nxt
+        del arena[new:]
+        self.watches.relocate(remap)
+        self.pending = [remap[cref] for cref in self.pending
+                        if cref in remap]
+        if self.ids is not None:
+            self.ids = {remap[cref]: id for cref, id in self.ids.items()
+                        if cref in remap}
+        for var, cref in enumerate(reason):
+            if cref >= 0:
+                reason[var] = remap[cref]
+        self.stats.nb_gc += 1
+
+    # fraction of the arena that can be wasted before gc
+    garbage_frac = .2
+
+    def propagate(self, lit, enqueue):
+        """
+        lit was assigned to True,
+        calls enqueue(cref, unit) for the clauses
+        that became unit, and returns a clause
+        that became unsat (None if there is none)
+        """
+        return self.watches.propagate(lit ^ 1, enqueue)
 
-    def assign_atom(self, atom, val):
-        self.watches.set(Literal(atom, val), 2)
-        self.watches.set(Literal(atom, not val), 0)
+    def assign_atom(self, index, val):
+        lit = 2 * index + (not val)
+        self.watches.set(lit, 2)
+        self.watches.set(lit ^ 1, 0)
 
-    def desassign_atom(self, atom):
-        self.watches.set(Literal(atom, True), 1)
-        self.watches.set(Literal(atom, False), 1)
+    def desassign_atom(self, index):
+        self.watches.set(2 * index, 1)
+        self.watches.set(2 * index + 1, 1)
 
     def __repr__(self):
         return 'ClauseDB(%s)' % self.watches
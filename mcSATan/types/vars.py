@@ -1,14 +1,23 @@
+from array import array
+from random import Random
+
 from .atomic import Atom
-from ..utils.priority_queue import MaxPriorityQ
+from ..utils.priority_queue import PriorityQ
 from ..watches import Watches
 
 
 class Var():
-    __slots__ = ('name', 'value',)
+    """
+    The index is the dense integer used by the core,
+    the value is only meaningful at the Solver API boundary
+    (see VarDB.export)
+    """
+    __slots__ = ('name', 'value', 'index')
 
     def __init__(self, name, value=None):
         self.name = name
         self.value = value
+        self.index = None
 
     # def vars(self):
     #     return [self]
@@ -33,11 +42,30 @@ class BoolVar(Var, Atom):
 class VarDB():
     """
     Variables database
-    
+
     Handles:
         - priority of assignment
         - mapping name -> Var (??? unicity of name)
+        - mapping index -> Var
         - semantic propagation
+
+    The core only manipulates the indices of the variables.
+
+    The priority of a variable is its type priority, then
+    (if branching is 'vsids') its activity: the variables
+    seen in the conflict analysis are bumped by an increment
+    that grows exponentially (EVSIDS).
+    With branching='static', only the type priority is used.
+
+    With phase_saving, the decisions on Bool variables use the value
+    they had when they were last unassigned (their saved phase).
+    The saved phases can be reset by rephase to the phases of the
+    largest assignment (best) or of the largest assignment since
+    the last rephase (target), or to all False (original) or all True
+    (inverted).
+
+    With a seed, the initial activities and phases are random
+    (to diversify the solvers of a portfolio).
     """
 
     # this should be defined here and not in
@@ -45,35 +73,207 @@ class VarDB():
     # strings are used for speed
     priority_from_type = {'Bool': 1, 'Rat': 2}
 
-    def __init__(self, stats):
+    # decay of the activities
+    var_decay = .95
+    # the activities are rescaled above this limit
+    max_activity = 1e100
+    # cycle of the phases used by rephase
+    rephase_cycle = ('best', 'original', 'best', 'target',
+                     'best', 'inverted', 'best', 'target')
+
+    def __init__(self, stats, branching='vsids', phase_saving=True,
+                 seed=None):
+        if branching not in ('vsids', 'static'):
+            raise ValueError('unknown branching %r' % branching)
         self.stats = stats
+        self.branching = branching
+        # index -> activity
+        self.activity = array('d')
+        self.var_inc = 1.
+        self.phase_saving = phase_saving
+        self.random = None if seed is None else Random(seed)
+        # index -> saved phase
+        self.phase = bytearray()
+        # phases of the largest assignments
+        # and number of assigned variables
+        self.target_phase = bytearray()
+        self.target_size = 0
+        self.best_phase = bytearray()
+        self.best_size = 0
         # mapping of all variables
         self.vars = {}
+        # index -> Var
+        self.by_index = []
+        # index -> 1 if the variable is a Bool
+        self.is_bool = bytearray()
+        # index -> priority
+        self.priority = array('i')
         # Semantic propagation
         self.watches = Watches()
         # Variable choice policy
-        self.pq = MaxPriorityQ()
+        # (min heap on the opposite of the priorities)
+        # the assigned variables are only removed when they are
+        # at the top (see can_decide)
+        self.pq = PriorityQ()
+        # index -> 1 if the variable is assigned
+        self.assigned = bytearray()
 
     def add(self, var):  # , priority=None):
+        """
+        registers var and returns its index
+        """
         assert var.name not in self.vars
         self.vars[var.name] = var
+        var.index = index = len(self.by_index)
+        self.by_index.append(var)
+        self.is_bool.append(var.type == 'Bool')
         # if priority is None:
         priority = self.priority_from_type[var.type]
-        self.pq.push(var, priority)
+        self.priority.append(priority)
+        if self.random is None:
+            self.activity.append(0.)
+            self.phase.append(0)
+        else:
+            self.activity.append(self.random.random())
+            self.phase.append(self.random.getrandbits(1))
+        self.target_phase.append(0)
+        self.best_phase.append(0)
+        self.assigned.append(0)
+        self.pq.push(index, self.key(index))
+        return index
 
-    def assign(self, var, value):
-        var.value = value
-        self.pq.remove(var)
-        self.watches.set(var, 0)
+    def key(self, index):
+        return -self.priority[index], -self.activity[index], index
 
-    def desassign(self, var):
-        var.value = None
-        priority = self.priority_from_type[var.type]
-        self.pq.push(var, priority)
-        self.watches.set(var, 1)
+    def bump(self, index):
+        """
+        bumps the activity of the variable
+        """
+        if self.branching == 'static':
+            return
+        activity = self.activity[index] + self.var_inc
+        self.activity[index] = activity
+        if activity > self.max_activity:
+            self.rescale()
+        elif index in self.pq:
+            self.pq.push(index, self.key(index))
+
+    def decay(self):
+        """
+        called after each conflict
+        """
+        self.var_inc /= self.var_decay
+
+    def rescale(self):
+        activity = self.activity
+        for index in range(len(activity)):
+            activity[index] /= self.max_activity
+        self.var_inc /= self.max_activity
+        for index in list(self.pq):
+            self.pq.push(index, self.key(index))
+
+    def assign(self, index):
+        self.assigned[index] = 1
+        self.watches.set(index, 0)
+
+    def desassign(self, index):
+        self.assigned[index] = 0
+        if index not in self.pq:
+            self.pq.push(index, self.key(index))
+        self.watches.set(index, 1)
 
     def pop(self):
-        return self.pq.pop()
+        """
+        unassigned variable of highest priority
+        """
+        pq = self.pq
+        assigned = self.assigned
+        while True:
+            index = pq.pop()
+            if not assigned[index]:
+                return index
+
+    def decide(self, index):
+        """
+        value of a decision on the variable
+        """
+        if self.phase_saving and self.is_bool[index]:
+            return bool(self.phase[index])
+        return self.by_index[index].decide()
+
+    def update_phases(self, stack):
+        """
+        called before backtracking with the assignment stack
+        of the Trail (literal codes), if it is the largest one
+        its values (and the saved phases of the other variables)
+        become the target phases, and the best ones
+        """
+        size = len(stack)
+        if size > self.target_size:
+            self.target_size = size
+            target = self.target_phase
+            target[:] = self.phase
+            is_bool = self.is_bool
+            for lit in stack:
+                if is_bool[lit >> 1]:
+                    target[lit >> 1] = not lit & 1
+            if size > self.best_size:
+                self.best_size = size
+                self.best_phase[:] = target
+
+    def rephase(self):
+        """
+        resets the saved phases following rephase_cycle
+        """
+        cycle = self.rephase_cycle
+        mode = cycle[self.stats.nb_rephases % len(cycle)]
+        self.stats.nb_rephases += 1
+        if mode == 'best':
+            self.phase[:] = self.best_phase
+        elif mode == 'target':
+            self.phase[:] = self.target_phase
+        elif mode == 'original':
+            self.phase[:] = bytes(len(self.phase))
+        elif mode == 'inverted':
+            self.phase[:] = b'\x01' * len(self.phase)
+        self.target_size = 0
+        return mode
 
     def can_decide(self):
-        return bool(self.pq)
+        """
+        True if a variable can be decided,
+        the assigned variables at the top of pq are removed
+        """
+        pq = self.pq
+        heap = pq.heap
+        assigned = self.assigned
+        while heap and assigned[heap[0]]:
+            pq.pop()
+        return bool(heap)
+
+    def export(self, values):
+        """
+        writes the values of the Bool variables
+        (from the literal values of the ClauseDB)
+        into the Var objects
+        """
+        for var in self.by_index:
+            if var.type == 'Bool':
+                val = values[2 * var.index]
+                var.value = None if val == 1 else val == 2
+
+    def model(self):
+        """
+        literal values (see ClauseDB) of the values
+        of the Bool Var objects, the inverse of export
+        """
+        values = bytearray(b'\1') * (2 * len(self.by_index))
+        for var in self.by_index:
+            if var.type == 'Bool' and var.value is not None:
+                lit = 2 * var.index
+                values[lit] = 2 if var.value else 0
+                values[lit + 1] = 0 if var.value else 2
+        return values
+
+    def __len__(self):
+        return len(self.by_index)
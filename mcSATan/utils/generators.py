@@ -0,0 +1,82 @@
+"""
+Generators of DIMACS benchmarks
+
+Each generator returns (number of variables, list of clauses)
+where the clauses are lists of DIMACS integers.
+"""
+
+from itertools import combinations
+from random import Random
+
+# clause/variable ratio of the phase transition of random k-SAT
+THRESHOLD = {3: 4.26, 4: 9.93, 5: 21.12}
+
+
+def dimacs(nvars, clauses):
+    """
+    text of a DIMACS file
+    """
+    return 'p cnf %s %s\n' % (nvars, len(clauses)) + ''.join(
+        ' '.join(map(str, clause)) + ' 0\n' for clause in clauses)
+
+
+def at_most_one(lits):
+    return [[-a, -b] for a, b in combinations(lits, 2)]
+
+
+def pigeonhole(pigeons, holes):
+    """
+    pigeons in holes, at most one pigeon per hole
+    unsat iff pigeons > holes
+    """
+    def var(i, j):
+        return i * holes + j + 1
+    clauses = [[var(i, j) for j in range(holes)] for i in range(pigeons)]
+    for j in range(holes):
+        clauses += at_most_one([var(i, j) for i in range(pigeons)])
+    return pigeons * holes, clauses
+
+
+def random_ksat(n, k=3, ratio=None, seed=0):
+    """
+    uniform random k-SAT with n variables,
+    at the phase transition by default
+    """
+    rand = Random(seed)
+    if ratio is None:
+        ratio = THRESHOLD[k]
+    return n, [[var if rand.getrandbits(1) else -var
+                for var in rand.sample(range(1, n + 1), k)]
+               for _ in range(round(ratio * n))]
+
+
+def parity(n):
+    """
+    perfect matching of the complete graph on n vertices
+    unsat iff n is odd
+    """
+    edges = {edge: i + 1 for i, edge in enumerate(combinations(range(n), 2))}
+    clauses = []
+    for v in range(n):
+        lits = [var for (a, b), var in edges.items() if v in (a, b)]
+        clauses.append(lits)
+        clauses += at_most_one(lits)
+    return len(edges), clauses
+
+
+def coloring(n, edges, colors, seed=0):
+    """
+    colors-coloring of a random graph with n vertices
+    """
+    rand = Random(seed)
+    pairs = rand.sample(list(combinations(range(n), 2)), edges)
+
+    def var(v, c):
+        return v * colors + c + 1
+    clauses = []
+    for v in range(n):
+        clauses.append([var(v, c) for c in range(colors)])
+        clauses += at_most_one([var(v, c) for c in range(colors)])
+    for a, b in pairs:
+        clauses += [[-var(a, c), -var(b, c)] for c in range(colors)]
+    return n * colors, clauses
@@ -1,41 +1,111 @@
-from heapq import heappush, heappop
-from .. import logger
+from array import array
 
 
 class PriorityQ():
+    """
+    Binary min heap of dense non negative integers
+
+    The position of each element in the heap is stored,
+    so that push, remove and changing a priority are
+    O(log n) and the heap never contains stale entries.
+    """
+
     def __init__(self):
-        self.heapq = []
-        self.contents = set()
+        self.heap = []
+        # elem -> index in the heap (-1 if absent)
+        self.pos = array('i')
+        # elem -> priority
+        self.priority = []
 
     def push(self, elem, priority):
-        logger.debug('PQ.push\n'
-                     '\telem: %s\n'
-                     '\theapq: %s\n'
-                     '\tcontents: %s\n', elem, self.heapq, self.contents)
-        self.contents.add(elem)
-        heappush(self.heapq, (priority, elem))
+        """
+        inserts elem, or changes its priority
+        if it is already in the heap
+        """
+        pos = self.pos
+        while len(pos) <= elem:
+            pos.append(-1)
+            self.priority.append(None)
+        self.priority[elem] = priority
+        i = pos[elem]
+        if i < 0:
+            i = len(self.heap)
+            self.heap.append(elem)
+            pos[elem] = i
+            self.sift_up(i)
+        else:
+            self.sift_up(i)
+            self.sift_down(pos[elem])
 
     def remove(self, elem):
-        logger.debug('PQ.remove\n'
-                     '\telem: %s\n'
-                     '\theapq: %s\n'
-                     '\tcontents: %s\n', elem, self.heapq, self.contents)
-
-        if elem in self.contents:
-            self.contents.remove(elem)
+        if elem not in self:
+            return
+        pos = self.pos
+        i = pos[elem]
+        pos[elem] = -1
+        last = self.heap.pop()
+        if last != elem:
+            self.heap[i] = last
+            pos[last] = i
+            self.sift_up(i)
+            self.sift_down(pos[last])
 
     def pop(self):
-        _, ans = heappop(self.heapq)
-        while not ans in self.contents:
-            _, ans = heappop(self.heapq)
-        self.contents.remove(ans)
+        ans = self.heap[0]
+        self.remove(ans)
         return ans
 
+    def sift_up(self, i):
+        heap = self.heap
+        pos = self.pos
+        priority = self.priority
+        elem = heap[i]
+        prio = priority[elem]
+        while i:
+            parent = (i - 1) >> 1
+            other = heap[parent]
+            if not prio < priority[other]:
+                break
+            heap[i] = other
+            pos[other] = i
+            i = parent
+        heap[i] = elem
+        pos[elem] = i
+
+    def sift_down(self, i):
+        heap = self.heap
+        pos = self.pos
+        priority = self.priority
+        n = len(heap)
+        elem = heap[i]
+        prio = priority[elem]
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and (priority[heap[child + 1]] <
+                                  priority[heap[child]]):
+                child += 1
+            other = heap[child]
+            if not priority[other] < prio:
+                break
+            heap[i] = other
+            pos[other] = i
+            i = child
+        heap[i] = elem
+        pos[elem] = i
+
+    def __contains__(self, elem):
+        return elem < len(self.pos) and self.pos[elem] >= 0
+
+    def __iter__(self):
+        return iter(self.heap)
+
     def __len__(self):
-        return len(self.contents)
+        return len(self.heap)
 
-    def __repr_(self):
-        return '%s(%r)' % (self.__name__, self.heapq)
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.heap)
 
 
 class MaxPriorityQ(PriorityQ):
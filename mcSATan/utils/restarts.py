@@ -0,0 +1,106 @@
+from collections import deque
+
+from .luby import luby
+
+
+class Restarts():
+    """
+    Restart policy
+
+    conflict(lbd) is called after each conflict with the LBD
+    of the learned clause, restart() is called before each
+    decision and returns True if the solver must restart.
+    This base class never restarts.
+    """
+    name = 'none'
+
+    def conflict(self, lbd):
+        pass
+
+    def restart(self):
+        return False
+
+
+class LubyRestarts(Restarts):
+    """
+    restarts after unit * 2 ** luby(i) conflicts
+    """
+    name = 'luby'
+
+    def __init__(self, unit=100):
+        self.unit = unit
+        self.index = 0
+        self.conflicts = 0
+
+    def conflict(self, lbd):
+        self.conflicts += 1
+
+    def restart(self):
+        if self.conflicts < self.unit << luby(self.index):
+            return False
+        self.conflicts = 0
+        self.index += 1
+        return True
+
+
+class GeometricRestarts(Restarts):
+    """
+    restarts after first * factor ** i conflicts
+    """
+    name = 'geometric'
+
+    def __init__(self, first=100, factor=1.5):
+        self.limit = first
+        self.factor = factor
+        self.conflicts = 0
+
+    def conflict(self, lbd):
+        self.conflicts += 1
+
+    def restart(self):
+        if self.conflicts < self.limit:
+            return False
+        self.conflicts = 0
+        self.limit *= self.factor
+        return True
+
+
+class GlucoseRestarts(Restarts):
+    """
+    restarts when the average LBD of the last window learned clauses,
+    multiplied by K, is above the average LBD of all the learned clauses
+
+    from "Refining Restarts Strategies for SAT and UNSAT"
+    by G. Audemard and L. Simon
+    """
+    name = 'glucose'
+
+    def __init__(self, window=50, K=.8):
+        self.K = K
+        self.recent = deque(maxlen=window)
+        self.recent_sum = 0
+        self.total = 0
+        self.count = 0
+
+    def conflict(self, lbd):
+        recent = self.recent
+        if len(recent) == recent.maxlen:
+            self.recent_sum -= recent[0]
+        recent.append(lbd)
+        self.recent_sum += lbd
+        self.total += lbd
+        self.count += 1
+
+    def restart(self):
+        recent = self.recent
+        if len(recent) < recent.maxlen or (
+                self.recent_sum * self.K * self.count <=
+                self.total * len(recent)):
+            return False
+        recent.clear()
+        self.recent_sum = 0
+        return True
+
+
+policies = {policy.name: policy for policy in
+            (Restarts, LubyRestarts, GeometricRestarts, GlucoseRestarts)}
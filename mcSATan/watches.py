@@ -1,7 +1,11 @@
+from array import array
 from collections import defaultdict  # , namedtuple
 from operator import add, sub
 
-from . import logger
+# layout of a clause in the arena of the ClauseDB:
+# a header of HEADER ints, then the literals
+SIZE, FLAGS, LBD, ACTIVITY = range(4)
+HEADER = 4
 
 
 class Watches():
@@ -32,6 +36,11 @@ class Watches():
         # elements associated with a wl
         self.elems = defaultdict(set)
 
+    def add_var(self):
+        """
+        nothing to do, the values are in a defaultdict
+        """
+
     def add_watch(self, elem, wl=None):
         """
         new values default to True
@@ -40,10 +49,6 @@ class Watches():
         if wl is None:
             wl = elem.watches()
         wl = tuple(sorted(set(wl), key=str))
-        logger.debug('add_watch:\n'
-                     '\telem: %s\n'
-                     '\twl: %s\n',
-                     elem, wl)
         self.elems[wl].add(elem)
         if not wl in self.lists:
             for i in wl:
@@ -66,11 +71,46 @@ class Watches():
             self.total[wl] = tot
             self.lists[tot].add(wl)
         self.values[var] = val
-        logger.debug('set\n'
-                     '\twatches: %s\n'
-                     '\tvar: %s\n'
-                     '\tval: %s\n',
-                     self, var, val)
+
+    def remove(self, elem, wl=None):
+        """
+        stops watching elem
+        calls elem.watches() if wl is None
+        """
+        if wl is None:
+            wl = elem.watches()
+        wl = tuple(sorted(set(wl), key=str))
+        elems = self.elems[wl]
+        elems.discard(elem)
+        if not elems:
+            del self.elems[wl]
+            self.lists[self.total.pop(wl)].remove(wl)
+            for i in wl:
+                self.in_watch[i].remove(wl)
+
+    def relocate(self, remap):
+        """
+        renames the elements with the mapping remap
+        """
+        for wl, elems in self.elems.items():
+            self.elems[wl] = {remap[elem] for elem in elems}
+
+    def propagate(self, var, enqueue):
+        """
+        var was set to 0: calls enqueue(elem, unit) for the
+        elements of its watchlists that are unit,
+        and returns an element whose watchlist has a total of 0
+        (None if there is none)
+        """
+        values = self.values
+        for wl in self.in_watch[var]:
+            total = self.total[wl]
+            if not total:
+                return next(iter(self.elems[wl]))
+            if total == 1:
+                unit = next(v for v in wl if values[v])
+                for elem in self.elems[wl]:
+                    enqueue(elem, unit)
 
     def units(self):
         """
@@ -100,130 +140,139 @@ class Watches():
         return ans + '\n'
 
 
-from random import shuffle
-
-
 class Watches2WL():
     """
 
     Implementation of the watched literals from
     http://matryoshka.gforge.inria.fr/pubs/sat_2wl_paper.pdf
 
-    Allow to set watchlists, aka lists of variables with memoized total.
-    Modify values of variables and the totals will be updated.
-    You can retrieve all the unit watchlists with their only unit term.
-
-    For convenience, you retrieve directly the element and not its watchlist
-
-
-    The watchlists are hashed, that allows *slightly* better performances
-    if multiple elements have the same watchlists.
-
-    TODO: handle single clauses, handle tuples in a nice way
+    Same interface as Watches, with the same meaning for
+    the values (0 is False, 1 is unassigned, 2 is True),
+    but the variables are dense integers (the literals of the
+    ClauseDB) and everything is stored in lists indexed by them.
+    Call add_var() twice per Bool variable (one per literal).
+
+    The elements are references of clauses in the arena
+    of the ClauseDB: the two first literals of a clause
+    are watched, and a clause is only visited by propagate
+    when one of its watched literals was set to 0.
+    Setting values (assigning or backtracking) does no watch work.
     """
 
-    def __init__(self):
+    def __init__(self, arena):
 
+        self.arena = arena
         # values of the variables
-        self.values = defaultdict(lambda: 1)
-        # in_watch[x] = list of watchlists containing x
-        self.in_watch = defaultdict(set)
+        self.values = bytearray()
+        # in_watch[x] = list of the clauses watching x
+        self.in_watch = []
 
-        # array of the watchlist
-        # watchlists are hashed
-        # but associated with an array
-        self.array = {}
+    def add_var(self):
+        self.values.append(1)
+        self.in_watch.append([])
 
-        # elements associated with a wl
-        self.elems = defaultdict(set)
-
-        self.unitswl = []
-        self.zeroswl = []
-
-    @staticmethod
-    def get_value(var):
-        x = self.values[var]
-        if isinstance(x, int):
-            return x
-        return x[0]
-
-    def swap2(self, l):
-        n = len(l)
-        i0 = max(range(n), key=self.values.__getitem__)
-        l[0], l[i0] = l[i0], l[0]
-        i1 = max(range(1, n), key=self.values.__getitem__)
-        l[1], l[i1] = l[i1], l[1]
+    def add_watch(self, elem, wl):
+        """
+        elem is the reference of a clause of the arena
+        whose literals are wl
 
-    def add_watch(self, elem, wl=None):
+        the order of wl is used to break ties
+        when choosing the watched literals
         """
-        new values default to True
-        calls elem.watches() if wl is None
+        values = self.values
+        if len(wl) > 1 and values[wl[0]] and values[wl[1]]:
+            # the first two literals can be watched
+            arr = wl
+        else:
+            # stable sort: best values first
+            arr = sorted(wl, key=values.__getitem__, reverse=True)
+            start = elem + HEADER
+            self.arena[start:start + len(arr)] = array('i', arr)
+        for var in arr[:2]:
+            self.in_watch[var].append(elem)
+
+    def remove(self, elem, wl=None):
         """
-        if wl is None:
-            wl = elem.watches()
-        wl = tuple(sorted(set(wl), key=str))
-        logger.debug('add_watch:\n'
-                     '\telem: %s\n'
-                     '\twl: %s\n',
-                     elem, wl)
-        self.elems[wl].add(elem)
-        if not wl in self.array:
-            arr = self.array[wl] = list(wl)
-            self.swap2(arr)
-            self.handle(wl)
-            self.in_watch[arr[0]].add(wl)
-            self.in_watch[arr[1]].add(wl)
-
-    def handle(self, wl):
-        arr = self.array[wl]
-        val = self.get_value(arr[0]) + self.get_value(arr[1])
-        if val == 0:
-            self.zeroswl.append(wl)
-        if val == 1:
-            self.unitswl.append(wl)
+        stops watching the clause elem
+        """
+        start = elem + HEADER
+        for var in self.arena[start:start + min(2, self.arena[elem])]:
+            self.in_watch[var].remove(elem)
 
-    def set(self, var, val):
+    def relocate(self, remap):
         """
-        change the value of var to val
-        and update the concerned totals
+        renames the clauses with the mapping remap
         """
-        if self.values[var] == val:
-            return
-        for wl in self.in_watch[var]:
-            arr = self.array[wl]
-            self.swap2(arr)
-            self.handle(wl)
-        logger.debug('set\n'
-                     '\twatches: %s\n'
-                     '\tvar: %s\n'
-                     '\tval: %s\n',
-                     self, var, val)
+        for watching in self.in_watch:
+            watching[:] = [remap[elem] for elem in watching]
 
-    def units(self):
+    def set(self, var, val):
         """
-        returns the watched elements and the only
-        unit variable in their watchlist
+        change the value of var to val
         """
-        for wl in self.unitswl:
-            var = self.array[wl][0]
-            for elem in self.elems[wl]:
-                yield elem, var
+        self.values[var] = val
 
-    def zeros(self):
+    def propagate(self, var, enqueue):
         """
-        returns the watched elements
+        var was set to 0: visits the clauses watching it,
+        calls enqueue(elem, unit) for the ones that are unit,
+        and returns one that is unsat (None if there is none)
         """
-        for wl in self.zeroswl:
-            yield from self.elems[wl]
+        values = self.values
+        arena = self.arena
+        in_watch = self.in_watch
+        watching = in_watch[var]
+        conflict = None
+        n = len(watching)
+        i = j = 0
+        while i < n:
+            elem = watching[i]
+            i += 1
+            start = elem + HEADER
+            end = start + arena[elem + SIZE]
+            if end - start > 1:
+                first = arena[start]
+                if first == var:
+                    first = arena[start] = arena[start + 1]
+                    arena[start + 1] = var
+                if values[first] == 2:
+                    watching[j] = elem
+                    j += 1
+                    continue
+                for k in range(start + 2, end):
+                    lit = arena[k]
+                    if values[lit]:
+                        # the watch moves to lit
+                        arena[start + 1] = lit
+                        arena[k] = var
+                        in_watch[lit].append(elem)
+                        break
+                else:
+                    k = 0
+                if k:
+                    continue
+                other = values[first]
+            else:
+                other = 0
+            watching[j] = elem
+            j += 1
+            if other:
+                enqueue(elem, first)
+            else:
+                # keep the remaining watches
+                watching[j:j + n - i] = watching[i:n]
+                j += n - i
+                conflict = elem
+                break
+        del watching[j:]
+        return conflict
 
     def __repr__(self):
-        ans = 'Watches\n'
-        for wl, elems in self.elems.items():
-            ans += '\twatch:\n'
-            ans += '\t\telems: %s\n' % (elems,)
-            ans += '\t\twl: %s\n' % (wl,)
-            ans += '\t\ttotal: %s\n' % self.total
-            ans += '\t\tvalues: %s\n' % [self.values[w] for w in wl]
+        ans = 'Watches2WL\n'
+        for lit, watching in enumerate(self.in_watch):
+            if watching:
+                ans += '\t%s (value %s): %s\n' % (
+                    lit, self.values[lit], watching)
         return ans + '\n'
 
 
@@ -0,0 +1,96 @@
+"""
+Search of a Solver in a worker process (see Solver.solve_async)
+
+The solver is copied to the worker through a checkpoint
+(see Solver.checkpoint). The worker sends back the answer,
+the values of the variables, the failed assumptions and the stats,
+its learned clauses are lost.
+
+The coroutine waits for the answer on the event loop,
+if it is cancelled (for instance by asyncio.wait_for)
+the worker is killed.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import traceback
+
+from .types import Literal
+
+
+def run(path, assumptions, budgets, conn):
+    """
+    resumes the solver of the checkpoint path, solves it and sends
+    (answer, values, failed, stopped, stats) to conn, where answer
+    is 'SAT', 'UNSAT' or 'UNKNOWN' (or 'ERROR' and a traceback)
+    """
+    from .core import Solver
+    try:
+        solver = Solver.resume(path)
+        variables = solver.variables
+        model = solver.solve([Literal.decode(code, variables)
+                              for code in assumptions], **budgets)
+        conn.send(('UNKNOWN' if model is None else
+                   'UNSAT' if model is False else 'SAT',
+                   [var.value for var in variables.by_index] if model
+                   else None,
+                   [lit.code for lit in solver.failed], solver.stopped,
+                   dict(solver.stats)))
+    except Exception:
+        conn.send(('ERROR', traceback.format_exc()))
+    conn.close()
+
+
+async def solve(solver, assumptions=(), context=None, **budgets):
+    """
+    see Solver.solve_async, context is a multiprocessing context
+    """
+    if solver.proof is not None:
+        raise ValueError('the worker cannot write the proof')
+    context = context or multiprocessing.get_context()
+    by_code = {lit.code: lit for lit in assumptions}
+    loop = asyncio.get_running_loop()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'solver.checkpoint')
+        solver.checkpoint(path)
+        reader, writer = context.Pipe(duplex=False)
+        process = context.Process(target=run, daemon=True,
+                                  args=(path, list(by_code), budgets,
+                                        writer))
+        process.start()
+        writer.close()
+        ready = loop.create_future()
+        loop.add_reader(reader.fileno(), lambda: ready.done() or
+                        ready.set_result(None))
+        try:
+            await ready
+            try:
+                result = reader.recv()
+            except EOFError:
+                process.join()
+                raise RuntimeError('the worker exited with code %s'
+                                   % process.exitcode)
+        finally:
+            loop.remove_reader(reader.fileno())
+            reader.close()
+            if process.is_alive():
+                process.kill()
+            process.join()
+    if result[0] == 'ERROR':
+        raise RuntimeError('error in the worker:\n' + result[1])
+    answer, values, failed, stopped, stats = result
+    for key, value in stats.items():
+        solver.stats[key] = value
+    solver.stopped = stopped
+    solver.failed = [by_code[code] for code in failed]
+    if answer == 'SAT':
+        for var, value in zip(solver.variables.by_index, values):
+            var.value = value
+        return list(solver.variables.vars.values())
+    if answer == 'UNSAT':
+        if not failed:
+            solver.ok = False
+        return False
+    return None
@@ -1,9 +1,9 @@
 #!/usr/bin/env bash
 
-python3 -OO -m cProfile -o $1.prof ./cnf.py $1
+python3 -OO -m cProfile -o $1.prof -m mcSATan.cnf $1
 gprof2dot -f pstats $1.prof | dot -Tpdf -o $1.prof.pdf
-open $1.prof.pdf
+if command -v xdg-open > /dev/null; then xdg-open $1.prof.pdf; else open $1.prof.pdf; fi
 snakeviz $1.prof
 
 # also
-# python3 -m vprof -c h "./cnf.py $1"
\ No newline at end of file
+# python3 -m vprof -c h "-m mcSATan.cnf $1"
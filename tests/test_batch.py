@@ -0,0 +1,53 @@
+import json
+
+from mcSATan import batch
+from test_cnf import folder, tests
+
+
+def php(path, pigeons, holes):
+    def var(i, j):
+        return i * holes + j + 1
+    clauses = [[var(i, j) for j in range(holes)] for i in range(pigeons)]
+    clauses += [[-var(i, j), -var(k, j)] for j in range(holes)
+                for i in range(pigeons) for k in range(i + 1, pigeons)]
+    path.write_text('p cnf %s %s\n' % (pigeons * holes, len(clauses)) +
+                    ''.join(' '.join(map(str, c)) + ' 0\n' for c in clauses))
+
+
+def read(path):
+    lines = {}
+    for line in path.open():
+        try:
+            line = json.loads(line)
+        except ValueError:
+            # truncated line
+            continue
+        lines[line['file']] = line
+    return lines
+
+
+def test_batch(tmp_path):
+    output = tmp_path / 'out.jsonl'
+    batch.main([str(folder), '--jobs', '2', '-o', str(output)])
+    lines = read(output)
+    assert len(lines) == len(list(folder.glob('*.cnf')))
+    for name, ans in tests:
+        line = lines[str(folder / name)]
+        assert line['status'] == ('SAT' if ans else 'UNSAT')
+        assert line['stats']['nb_clauses'] >= 1
+
+    # resume after an interruption in the middle of a line
+    text = output.read_text().splitlines(True)
+    output.write_text(''.join(text[:3]) + text[3][:20])
+    batch.main([str(folder / '*.cnf'), '--jobs', '2',
+                '-o', str(output), '--resume'])
+    assert read(output).keys() == lines.keys()
+
+
+def test_timeout(tmp_path):
+    php(tmp_path / 'php.cnf', 11, 10)
+    output = tmp_path / 'out.jsonl'
+    batch.main([str(tmp_path), '--timeout', '.5', '-o', str(output)])
+    line, = read(output).values()
+    assert line['status'] == 'TIMEOUT'
+    assert line['stats']['nb_conflicts'] > 0
@@ -0,0 +1,44 @@
+import pytest
+
+from mcSATan import bench
+from mcSATan.parsers.DIMACS import parse_cnf
+from mcSATan.utils import generators
+
+
+@pytest.mark.parametrize('generator, sat', [
+    (lambda: generators.pigeonhole(5, 4), False),
+    (lambda: generators.pigeonhole(4, 4), True),
+    (lambda: generators.parity(7), False),
+    (lambda: generators.parity(6), True),
+    (lambda: generators.coloring(10, 15, 4), True),
+    (lambda: generators.coloring(5, 10, 4), False),
+    (lambda: generators.random_ksat(30, ratio=2), True),
+])
+def test_generators(tmp_path, generator, sat):
+    path = tmp_path / 'instance.cnf'
+    nvars, clauses = generator()
+    path.write_text(generators.dimacs(nvars, clauses))
+    solver = parse_cnf(str(path))
+    assert (solver.solve() is not False) == sat
+    if sat:
+        values = {int(var.name[3:]): var.value
+                  for var in solver.variables.by_index}
+        assert all(any(values[abs(lit)] == (lit > 0) for lit in clause)
+                   for clause in clauses)
+
+
+def test_bench(tmp_path):
+    files = bench.instances(tmp_path, 'parity-1[01]')
+    assert sorted(files) == ['parity-10', 'parity-11']
+    results = bench.run(files)
+    assert results['parity-10']['status'] == 'SAT'
+    assert results['parity-11']['status'] == 'UNSAT'
+    assert results['parity-11']['conflicts_per_s'] > 0
+    assert bench.compare(results, results) == []
+    slower = {name: dict(metrics, wall_time=2 * metrics['wall_time'] + 1)
+              for name, metrics in results.items()}
+    assert len(bench.compare(slower, results, min_time=0)) == 2
+    changed = dict(results, **{'parity-10': dict(results['parity-10'],
+                                                 status='UNSAT')})
+    assert bench.compare(changed, results) == [
+        'parity-10: UNSAT instead of SAT']
@@ -0,0 +1,114 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from mcSATan.core import UNKNOWN
+from mcSATan.parsers.DIMACS import parse_cnf
+from mcSATan.utils import generators
+from test_cnf import folder
+
+
+@pytest.fixture
+def hard(tmp_path):
+    """
+    an UNSAT formula that needs about 1600 conflicts
+    """
+    path = tmp_path / 'hard.cnf'
+    path.write_text(generators.dimacs(*generators.random_ksat(130, 3,
+                                                              seed=2)))
+    return str(path)
+
+
+@pytest.mark.parametrize('budget, key', [
+    ('conflicts', 'nb_conflicts'),
+    ('propagations', 'nb_clausal_propagations'),
+    ('decisions', 'nb_decisions')])
+def test_counters(hard, budget, key):
+    solver = parse_cnf(hard)
+    for i in range(1, 4):
+        assert solver.solve(**{budget: 500}) is UNKNOWN
+        assert solver.stopped == budget
+        assert solver.stats['nb_stopped_' + budget] == i
+        assert 500 * i <= solver.stats[key]
+        if budget != 'propagations':
+            assert solver.stats[key] == 500 * i
+    assert solver.solve() is False
+    assert solver.stopped is None
+
+
+def test_time(hard):
+    solver = parse_cnf(hard)
+    dbt = time.perf_counter()
+    assert solver.solve(time=.1) is UNKNOWN
+    assert solver.stopped == 'time'
+    assert time.perf_counter() - dbt < 1
+    assert solver.stats.nb_conflicts > 0
+
+
+def test_interrupt(hard):
+    solver = parse_cnf(hard)
+    timer = threading.Timer(.1, solver.interrupt)
+    timer.start()
+    assert solver.solve() is UNKNOWN
+    timer.join()
+    assert solver.stopped == 'interrupt'
+    assert not solver.interrupted
+    # before the search
+    solver.interrupt()
+    assert solver.solve() is UNKNOWN
+    assert solver.solve() is False
+
+
+def test_sat_budget():
+    solver = parse_cnf(str(folder / 'php1414.cnf'))
+    assert solver.solve(decisions=0) is UNKNOWN
+    assert solver.solve(decisions=10 ** 6)
+
+
+def test_async(hard):
+    async def main():
+        solver = parse_cnf(hard)
+        assert await solver.solve_async(conflicts=100) is UNKNOWN
+        assert solver.stopped == 'conflicts'
+        assert solver.stats.nb_conflicts == 100
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(solver.solve_async(), .2)
+        assert not multiprocessing.active_children()
+        # the event loop is not blocked
+        ticks = 0
+        task = asyncio.ensure_future(solver.solve_async())
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(.01)
+        assert await task is False
+        assert ticks > 1
+        assert not solver.ok
+
+        solver = parse_cnf(str(folder / 'php1414.cnf'))
+        model = await solver.solve_async()
+        assert model
+        solver.check_model()
+        var = solver.variables.by_index[0]
+        lit = solver.Literal(var, not var.value)
+        solver.Clause(solver.Literal(var, var.value))
+        assert await solver.solve_async([lit]) is False
+        assert solver.failed == [lit]
+        assert solver.ok
+
+    asyncio.run(main())
+
+
+def test_async_cancel(hard):
+    async def main():
+        solver = parse_cnf(hard)
+        task = asyncio.ensure_future(solver.solve_async())
+        await asyncio.sleep(.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not multiprocessing.active_children()
+
+    asyncio.run(main())
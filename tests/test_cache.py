@@ -0,0 +1,174 @@
+import os
+import random
+from array import array
+
+import pytest
+
+from mcSATan.cache import ClauseCache, fingerprints, checksum
+from mcSATan.checkpoint import write
+from mcSATan.parsers.DIMACS import parse_cnf
+from mcSATan.utils import generators
+
+
+def formula(tmp_path, name, nvars, clauses):
+    path = tmp_path / name
+    path.write_text(generators.dimacs(nvars, clauses))
+    return str(path)
+
+
+def test_fingerprints():
+    lits = array('i', [0, 3, 5, 2, 2, 7, 1])
+    offsets = array('q', [0, 3, 6, 7])
+    prints = fingerprints(lits, offsets)
+    assert list(prints) == sorted(prints)
+    # order of the clauses and of the literals, duplicates
+    other = fingerprints(array('i', [1, 7, 2, 5, 3, 0]),
+                         array('q', [0, 1, 3, 6]))
+    assert prints == other
+    assert fingerprints(lits, offsets[:3]) != prints
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_repeated(tmp_path, seed):
+    cache = str(tmp_path / 'cache')
+    path = formula(tmp_path, 'f.cnf', *generators.random_ksat(100, 3,
+                                                              seed=seed))
+    first = parse_cnf(path, cache=cache)
+    answer = bool(first.solve())
+    assert first.stats.nb_cache_hits == 0
+    assert len(os.listdir(cache)) == 1
+    second = parse_cnf(path, cache=cache)
+    assert bool(second.solve()) == answer
+    assert second.stats.nb_cache_hits == 1
+    assert second.stats.nb_cached_clauses > 0
+    assert len(os.listdir(cache)) == 1
+
+
+def test_superset(tmp_path):
+    cache = ClauseCache(str(tmp_path / 'cache'))
+    nvars, clauses = generators.random_ksat(100, 3, seed=5)
+    small = formula(tmp_path, 'small.cnf', nvars, clauses[:300])
+    solver = parse_cnf(small, cache=cache)
+    assert solver.solve()
+    # a subset of the small formula does not use its entry
+    smaller = parse_cnf(formula(tmp_path, 'smaller.cnf', nvars,
+                                clauses[:200]), cache=cache)
+    smaller.solve()
+    assert smaller.stats.nb_cache_hits == 0
+    for extra in range(1, 5):
+        clauses.append(random.Random(extra).sample(range(1, nvars), 3))
+        other = parse_cnf(formula(tmp_path, 'big%s.cnf' % extra, nvars,
+                                  clauses), cache=cache)
+        answer = other.solve()
+        assert other.stats.nb_cache_hits == 1
+        reference = parse_cnf(formula(tmp_path, 'big.cnf', nvars, clauses))
+        assert bool(answer) == bool(reference.solve())
+
+
+def test_stale(tmp_path):
+    """
+    an entry of unit clauses that are not implied
+    """
+    cache = ClauseCache(str(tmp_path / 'cache'))
+    nvars, clauses = generators.random_ksat(50, 3, ratio=3, seed=0)
+    path = formula(tmp_path, 'f.cnf', nvars, clauses)
+    solver = parse_cnf(path, cache=cache)
+    model = solver.solve()
+    assert model
+    wrong = array('i')
+    for var in model:
+        # the negation of the model
+        wrong.extend((1, 1, 2 * var.index + bool(var.value)))
+    key, = os.listdir(cache.directory)
+    arrays = dict(fingerprints=solver.fingerprints(), clauses=wrong,
+                  phase=array('B', bytes(nvars)))
+    write(os.path.join(cache.directory, key),
+          dict(nb_clauses=len(clauses), checksum=checksum(arrays)), arrays)
+    other = parse_cnf(path, cache=cache)
+    assert other.solve()
+    assert other.stats.nb_cache_hits == 1
+    assert other.stats.nb_cache_rejected > 0
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_units(tmp_path, seed):
+    """
+    the cached units implied by the cached clauses
+    are assigned at level 0 when the entry is loaded
+    """
+    cache = str(tmp_path / 'cache')
+    nvars, php = generators.pigeonhole(3, 2)
+    # a copy of php for each value of the variable 1
+    clauses = [[sign] + [lit + shift if lit > 0 else lit - shift
+                         for lit in clause]
+               for sign, shift in ((1, 1), (-1, nvars + 1))
+               for clause in php]
+    path = formula(tmp_path, 'f.cnf', 2 * nvars + 1, clauses)
+    first = parse_cnf(path, cache=cache, preprocess=(), seed=seed)
+    assert first.solve() is False
+    units = list(first.trail.stack)
+    assert units
+    second = parse_cnf(path, cache=cache, preprocess=(), seed=seed)
+    second.load_cache()
+    assert second.stats.nb_cache_rejected == 0
+    for lit in units:
+        assert second.clauses.values[lit] == 2
+        assert second.trail.lvl[lit >> 1] == 0
+
+
+def test_corrupted(tmp_path):
+    cache = str(tmp_path / 'cache')
+    path = formula(tmp_path, 'f.cnf', *generators.random_ksat(80, 3, seed=1))
+    answer = bool(parse_cnf(path, cache=cache).solve())
+    key, = os.listdir(cache)
+    entry = os.path.join(cache, key)
+    data = bytearray(open(entry, 'rb').read())
+    data[-1] ^= 1
+    open(entry, 'wb').write(data)
+    solver = parse_cnf(path, cache=cache)
+    assert bool(solver.solve()) == answer
+    assert solver.stats.nb_cache_hits == 0
+    # replaced by the entry of the new solve
+    assert ClauseCache(cache).read(entry) is not None
+
+
+def test_lru(tmp_path):
+    cache = ClauseCache(str(tmp_path / 'cache'), max_bytes=1)
+    for seed in range(3):
+        path = formula(tmp_path, 'f%s.cnf' % seed,
+                       *generators.random_ksat(60, 3, ratio=3, seed=seed))
+        parse_cnf(path, cache=cache).solve()
+        # only the last one
+        assert len(cache.entries()) == 1
+    cache.max_bytes = 1 << 20
+    for seed in range(3):
+        path = formula(tmp_path, 'f%s.cnf' % seed,
+                       *generators.random_ksat(60, 3, ratio=3, seed=seed))
+        parse_cnf(path, cache=cache).solve()
+    assert len(cache.entries()) == 3
+    last = cache.entries()[-1]
+    cache.max_bytes = os.path.getsize(last)
+    parse_cnf(str(tmp_path / 'f1.cnf'), cache=cache).solve()
+    entries = cache.entries()
+    assert len(entries) == 1 and entries != [last]
+
+
+def test_lookup_reads_headers(tmp_path, monkeypatch):
+    cache = ClauseCache(str(tmp_path / 'cache'))
+    nvars, clauses = generators.random_ksat(60, 3, ratio=3, seed=0)
+    for size in (50, 100, 150):
+        parse_cnf(formula(tmp_path, 'f%s.cnf' % size, nvars,
+                          clauses[:size]), cache=cache).solve()
+    # an unrelated formula
+    parse_cnf(formula(tmp_path, 'other.cnf', *generators.random_ksat(
+        60, 3, ratio=3, seed=1)), cache=cache).solve()
+    checked = []
+    monkeypatch.setattr('mcSATan.cache.checksum', lambda arrays: (
+        checked.append(len(arrays['fingerprints'])),
+        checksum(arrays))[1])
+    prints = parse_cnf(formula(tmp_path, 'f.cnf', nvars, clauses[:170]),
+                       check=True).fingerprints()
+    arrays = cache.lookup(prints)
+    assert len(arrays['fingerprints']) == 150
+    # only the entry that is picked is checksummed
+    assert checked == [150]
@@ -0,0 +1,149 @@
+from array import array
+
+import pytest
+
+from mcSATan import checkpoint
+from mcSATan.core import Solver
+from mcSATan.parsers.DIMACS import parse_cnf
+from mcSATan.types.clauses import LEARNED
+from mcSATan.watches import FLAGS, LBD, ACTIVITY
+from mcSATan.utils import generators
+from test_cnf import folder
+
+
+def test_format(tmp_path):
+    path = str(tmp_path / 'file.ckpt')
+    arrays = dict(a=array('i', [1, -2, 3]), b=array('B', b'xyz'),
+                  c=array('d', [.5, 1e100]), d=array('q'))
+    checkpoint.write(path, dict(answer=42), arrays)
+    header, loaded = checkpoint.read(path)
+    assert header['answer'] == 42
+    assert loaded == arrays
+    data = open(path, 'rb').read()
+    for name, (typecode, offset, length) in header['arrays'].items():
+        assert offset % checkpoint.ALIGN == 0
+        assert memoryview(data)[offset:].cast(typecode)[:length].tolist() \
+            == arrays[name].tolist()
+
+
+def test_not_checkpoint(tmp_path):
+    path = tmp_path / 'file.ckpt'
+    path.write_bytes(b'p cnf 1 1\n1 0\n')
+    with pytest.raises(ValueError):
+        Solver.resume(str(path))
+
+
+def clauses(solver):
+    db = solver.clauses
+    arena = db.arena
+    return [(list(db.literals(cref)), arena[cref + FLAGS] & LEARNED,
+             arena[cref + LBD], arena[cref + ACTIVITY])
+            for cref in db.crefs()]
+
+
+@pytest.mark.parametrize('name', ['php76.cnf', 'php88.cnf', 'php1414.cnf'])
+def test_resume(tmp_path, name):
+    path = str(tmp_path / 'solver.ckpt')
+    solver = parse_cnf(str(folder / name), seed=1)
+    solver.solve(conflicts=100)
+    conflicts = solver.stats.nb_conflicts
+    solver.checkpoint(path)
+    resumed = Solver.resume(path)
+    assert resumed.config == solver.config
+    assert resumed.stats.nb_resumes == 1
+    for key in ('nb_conflicts', 'nb_learned_clauses', 'hist_learned_lbd'):
+        assert resumed.stats[key] == solver.stats[key]
+    variables, other = solver.variables, resumed.variables
+    assert other.activity == variables.activity
+    assert other.phase == variables.phase
+    assert other.best_phase == variables.best_phase
+    assert other.var_inc == variables.var_inc
+    assert list(other.vars) == list(variables.vars)
+    assert (resumed.preprocessor.eliminated_vars ==
+            solver.preprocessor.eliminated_vars)
+    assert set(other.pq) == set(variables.pq)
+    # the level 0 assignments are added as unit clauses
+    units = [([lit], 0, 0, 0) for lit in solver.trail.stack]
+    assert clauses(resumed) == clauses(solver) + units
+    assert any(learned for _, learned, _, _ in clauses(resumed))
+    model = solver.solve()
+    assert bool(resumed.solve()) == bool(model)
+    assert resumed.stats.nb_conflicts >= conflicts
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_eliminated(tmp_path, seed):
+    cnf = tmp_path / 'random.cnf'
+    cnf.write_text(generators.dimacs(*generators.random_ksat(
+        60, 3, ratio=3.8, seed=seed)))
+    path = str(tmp_path / 'solver.ckpt')
+    solver = parse_cnf(str(cnf))
+    solver.preprocess()
+    solver.checkpoint(path)
+    resumed = Solver.resume(path)
+    assert resumed.preprocessed
+    assert resumed.preprocessor.eliminated == solver.preprocessor.eliminated
+    # the model is checked against the original clauses
+    assert bool(resumed.solve()) == bool(solver.solve())
+    # the eliminated variables can be restored
+    var = resumed.variables.by_index[0]
+    lit = resumed.Literal(var, True)
+    resumed.Clause(lit)
+    model = resumed.solve()
+    assert model is False or var.value is True
+
+
+def test_auto(tmp_path):
+    path = str(tmp_path / 'solver.ckpt')
+    solver = parse_cnf(str(folder / 'php76.cnf'), checkpoint_path=path,
+                       checkpoint_every=100)
+    assert solver.solve() is False
+    assert solver.stats.nb_checkpoints > 1
+    resumed = Solver.resume(path)
+    assert 0 < resumed.stats.nb_conflicts < solver.stats.nb_conflicts
+    assert resumed.checkpoint_path == path
+    assert resumed.solve() is False
+    assert resumed.stats.nb_checkpoints >= solver.stats.nb_checkpoints - 1
+
+
+def test_auto_without_restarts(tmp_path):
+    """
+    the checkpoints do not wait for a restart
+    """
+    path = str(tmp_path / 'solver.ckpt')
+    solver = parse_cnf(str(folder / 'php76.cnf'), restarts='none',
+                       checkpoint_path=path, checkpoint_every=50)
+    assert solver.solve(conflicts=500) is None
+    assert solver.stats.nb_checkpoints == 10
+    resumed = Solver.resume(path)
+    assert resumed.stats.nb_conflicts == 500
+    assert resumed.solve() is False
+
+
+def test_incremental(tmp_path):
+    path = str(tmp_path / 'solver.ckpt')
+    solver = Solver(preprocess=())
+    a, b = solver.BoolVar('a'), solver.BoolVar('b')
+    solver.Clause(solver.Literal(a, True), solver.Literal(b, True))
+    assert solver.solve([solver.Literal(a, False)])
+    solver.Clause(solver.Literal(b, False))
+    solver.checkpoint(path)
+    resumed = Solver.resume(path)
+    a, b = resumed.variables.vars['a'], resumed.variables.vars['b']
+    assert resumed.solve()
+    assert a.value is True and b.value is False
+    assert resumed.solve([resumed.Literal(a, False)]) is False
+    assert resumed.failed == [resumed.Literal(a, False)]
+
+
+def test_errors(tmp_path):
+    path = str(tmp_path / 'solver.ckpt')
+    with pytest.raises(ValueError):
+        Solver(checkpoint_every=10)
+    solver = parse_cnf(str(folder / 'php54.cnf'), check=False)
+    solver.checkpoint(path)
+    with pytest.raises(ValueError):
+        Solver.resume(path, check=True)
+    assert Solver.resume(path).solve() is False
+    with pytest.raises(ValueError):
+        Solver.resume(path, proof=str(tmp_path / 'proof'))
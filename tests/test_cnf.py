@@ -1,8 +1,9 @@
+import io
 from pathlib import Path
 
 import pytest
 
-from mcSATan.parsers.DIMACS import parse_cnf
+from mcSATan.parsers.DIMACS import parse_cnf, openers, read_cnf
 
 
 
@@ -18,9 +19,80 @@ tests = [
     ('simple_v3_c2.cnf', True),
 ]
 
+def check_model(f, model):
+    values = {var.name: var.value for var in model}
+    for line in f.open():
+        line = line.split()
+        if not line or line[0] in 'cp':
+            continue
+        lits = [int(i) for i in line[:-1]]
+        assert any(values['var%s' % abs(i)] == (i > 0) for i in lits)
+
+
+options = [
+    {},
+    {'bcp': 'counting'},
+    {'minimize': False},
+    {'branching': 'static'},
+    {'rephase': 5},
+    {'phase_saving': False},
+    {'restarts': 'none'},
+    {'restarts': 'geometric'},
+    {'restarts': 'glucose'},
+    {'reduce': 'activity', 'reduce_interval': 20},
+    {'max_learned': 10},
+    {'preprocess': ()},
+    {'preprocess': ('eliminate',)},
+]
+
+
+@pytest.mark.parametrize("options", options, ids=str)
 @pytest.mark.parametrize("name,ans", tests)
-def test_cnf(name, ans):
+def test_cnf(name, ans, options):
     f = folder / name
-    solver = parse_cnf(f.open())
-    assert (solver.solve() is not False) == ans
-    
\ No newline at end of file
+    solver = parse_cnf(f.open(), **options)
+    model = solver.solve()
+    assert (model is not False) == ans
+    if model:
+        check_model(f, model)
+    
+
+@pytest.mark.parametrize('name', ['php54.cnf', 'php76.cnf'])
+def test_minimize(name):
+    stats = {}
+    for minimize in (True, False):
+        solver = parse_cnf(str(folder / name), minimize=minimize)
+        solver.solve()
+        stats[minimize] = solver.stats
+    assert (stats[True].nb_learned_literals <
+            stats[True].nb_learned_literals_before)
+    assert (stats[False].nb_learned_literals ==
+            stats[False].nb_learned_literals_before > 0)
+
+
+@pytest.mark.parametrize("ext", ['', '.gz', '.bz2', '.xz'])
+def test_compressed(tmp_path, ext):
+    f = folder / 'php33.cnf'
+    path = tmp_path / ('php33.cnf' + ext)
+    with (openers[ext] if ext else open)(path, 'wb') as out:
+        out.write(f.read_bytes())
+    solver = parse_cnf(str(path))
+    assert solver.stats.parse_bytes == len(f.read_bytes())
+    model = solver.solve()
+    check_model(f, model)
+
+
+def test_satlib_trailer():
+    # SATLIB benchmarks end with '%' and '0'
+    text = 'c comment\np cnf 3 2\n1 -3 0 2\n3 -1 0\n%\n0\n'
+    solver = parse_cnf(io.StringIO(text))
+    assert solver.stats.nb_clauses == 2
+    assert solver.solve()
+
+
+@pytest.mark.parametrize('name', ['php54.cnf', 'php1414.cnf'])
+@pytest.mark.parametrize('chunk', [3, 14, 17])
+def test_chunks(name, chunk):
+    data = (folder / name).read_bytes()
+    expected = read_cnf(io.BytesIO(data))
+    assert read_cnf(io.BytesIO(data), chunk) == expected
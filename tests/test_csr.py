@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from mcSATan import csr
+from mcSATan.csr import ClauseMatrix
+from mcSATan.parsers.DIMACS import parse_cnf
+from mcSATan.utils import generators
+from test_cnf import folder
+
+BACKENDS = [False, pytest.param(True, marks=pytest.mark.skipif(
+    csr.np is None, reason='NumPy is not installed'))]
+
+
+def random_case(seed, n=12, m=60):
+    rng = random.Random(seed)
+    clauses = [[2 * rng.randrange(n) + rng.randrange(2)
+                for _ in range(rng.randrange(5))] for _ in range(m)]
+    values = bytearray(2 * n)
+    for var in range(n):
+        val = rng.choice((0, 1, 2))
+        values[2 * var] = val
+        values[2 * var + 1] = 2 - val
+    return clauses, values
+
+
+@pytest.mark.parametrize('numpy', BACKENDS)
+@pytest.mark.parametrize('seed', range(20))
+def test_evaluation(numpy, seed):
+    clauses, values = random_case(seed)
+    matrix = ClauseMatrix(numpy)
+    for clause in clauses[:10]:
+        matrix.add(clause)
+    lits, offsets = [], [0]
+    for clause in clauses[10:]:
+        lits += clause
+        offsets.append(len(lits))
+    matrix.add_clauses(lits, offsets)
+    assert len(matrix) == len(clauses)
+    assert [list(matrix.clause(i)) for i in range(len(matrix))] == clauses
+    for _ in range(2):
+        # the second time from the cache
+        assert matrix.unsatisfied(values) == [
+            i for i, clause in enumerate(clauses)
+            if all(values[lit] != 2 for lit in clause)]
+        assert matrix.falsified(values) == [
+            i for i, clause in enumerate(clauses)
+            if all(values[lit] == 0 for lit in clause)]
+        units = []
+        for i, clause in enumerate(clauses):
+            free = [lit for lit in clause if values[lit] == 1]
+            if all(values[lit] != 2 for lit in clause) and len(free) == 1:
+                units.append((i, free[0]))
+        assert matrix.units(values) == units
+
+
+def test_from_clausedb():
+    solver = parse_cnf(str(folder / 'php54.cnf'), preprocess=())
+    assert solver.solve() is False
+    clauses = solver.clauses
+    matrix = ClauseMatrix.from_clausedb(clauses)
+    original = ClauseMatrix.from_clausedb(clauses, learned=False)
+    assert len(original) < len(matrix) == len(list(clauses.crefs()))
+    for i, cref in enumerate(matrix.crefs):
+        assert list(matrix.clause(i)) == list(clauses.literals(cref))
+
+
+def test_check_model():
+    solver = parse_cnf(str(folder / 'simple_v3_c2.cnf'))
+    model = solver.solve()
+    assert model
+    solver.check_model()
+    assert solver.stats.time_check > 0
+    clauses = solver.original
+    lit = clauses.clause(0)[0]
+    for var in model:
+        if var.index == lit >> 1:
+            var.value = not var.value
+            break
+    with pytest.raises(RuntimeError, match='invalid model'):
+        solver.check_model()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_check_random(tmp_path, seed):
+    path = tmp_path / 'random.cnf'
+    path.write_text(generators.dimacs(*generators.random_ksat(
+        40, 3, ratio=3.5, seed=seed)))
+    solver = parse_cnf(str(path))
+    if solver.solve():
+        # checked by solve
+        assert solver.stats.time_check > 0
+
+
+def test_no_check():
+    solver = parse_cnf(str(folder / 'simple_v3_c2.cnf'), check=False)
+    assert solver.original is None
+    assert solver.solve()
@@ -0,0 +1,28 @@
+from collections import namedtuple
+
+import pytest
+
+from mcSATan import cube
+from mcSATan.parsers.DIMACS import parse_cnf
+from test_cnf import folder, tests, check_model
+
+Var = namedtuple('Var', 'name value')
+
+
+@pytest.mark.parametrize("name,ans", tests)
+def test_cube(name, ans):
+    model, stats = cube.solve(str(folder / name), jobs=2, depth=3)
+    assert (model is not False) == ans
+    if model:
+        check_model(folder / name, [Var('var%s' % (i + 1), value)
+                                    for i, value in enumerate(model)])
+
+
+def test_lookahead():
+    solver = parse_cnf(str(folder / 'php76.cnf'))
+    cubes = cube.Lookahead(solver).cubes(3)
+    assert 1 < len(cubes) <= 8
+    assert solver.trail.level == 0
+    for lits in cubes:
+        assert cube.init(str(folder / 'php76.cnf'), {}) is None
+        assert cube.conquer((lits, None))[1] is False
@@ -0,0 +1,77 @@
+from itertools import product
+from random import Random
+
+import pytest
+
+from mcSATan.core import Solver
+from mcSATan.parsers.DIMACS import parse_cnf
+from test_cnf import folder
+
+
+def brute(n, clauses):
+    return any(all(any(bits[abs(i) - 1] == (i > 0) for i in clause)
+                   for clause in clauses)
+               for bits in product([False, True], repeat=n))
+
+
+def test_assumptions():
+    solver = Solver()
+    x, y, z = (solver.BoolVar(name) for name in 'xyz')
+    solver.Clause(solver.Literal(x, False), solver.Literal(y, True))
+    solver.Clause(solver.Literal(y, False), solver.Literal(z, True))
+    assert solver.solve([solver.Literal(x, True)])
+    assert x.value and y.value and z.value
+    assert solver.trail.level == 0
+    assumptions = [solver.Literal(y, True), solver.Literal(x, True),
+                   solver.Literal(z, False)]
+    assert solver.solve(assumptions) is False
+    assert set(solver.failed) in ({assumptions[0], assumptions[2]},
+                                  {assumptions[1], assumptions[2]})
+    solver.Clause(solver.Literal(x, True))
+    assert solver.solve() and z.value
+    assert solver.solve([solver.Literal(z, False)]) is False
+    solver.Clause(solver.Literal(z, False))
+    assert solver.solve() is False
+    assert solver.failed == []
+    assert solver.solve() is False
+
+
+@pytest.mark.parametrize("preprocess", [(), ('units', 'eliminate')])
+def test_random(preprocess):
+    rand = Random(0)
+    for _ in range(100):
+        n = rand.randint(2, 8)
+        solver = Solver(preprocess=preprocess)
+        variables = [solver.BoolVar(i) for i in range(n)]
+
+        def lit(i):
+            return solver.Literal(variables[abs(i) - 1], i > 0)
+        clauses = []
+        for k in range(20):
+            if not k % 2:
+                clause = [rand.choice([-1, 1]) * rand.randint(1, n)
+                          for _ in range(rand.randint(1, 3))]
+                clauses.append(clause)
+                solver.Clause(*map(lit, clause))
+            assumptions = [rand.choice([-1, 1]) * rand.randint(1, n)
+                           for _ in range(rand.randint(0, 3))]
+            model = solver.solve([lit(i) for i in assumptions])
+            units = [[i] for i in assumptions]
+            assert (model is not False) == brute(n, clauses + units)
+            if model is False:
+                failed = [(i.atom.name + 1) * (1 if i.bool else -1)
+                          for i in solver.failed]
+                assert set(failed) <= set(assumptions)
+                assert not brute(n, clauses + [[i] for i in failed])
+            else:
+                assert all(any(variables[abs(i) - 1].value == (i > 0)
+                               for i in clause)
+                           for clause in clauses + units)
+
+
+def test_conflicts_budget():
+    solver = parse_cnf(str(folder / 'php76.cnf'))
+    assert solver.solve(conflicts=10) is None
+    assert solver.stats.nb_conflicts == 10
+    assert solver.trail.level == 0
+    assert solver.solve() is False
@@ -0,0 +1,28 @@
+import pytest
+
+from mcSATan.parsers.DIMACS import parse_cnf
+from mcSATan.utils import generators
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_best_phase(tmp_path, seed):
+    path = tmp_path / 'random.cnf'
+    path.write_text(generators.dimacs(*generators.random_ksat(
+        150, 3, seed=seed)))
+    solver = parse_cnf(str(path), rephase=0)
+    variables = solver.variables
+    update_phases = variables.update_phases
+    # values of the largest assignment
+    best = {}
+
+    def spy(stack):
+        if len(stack) > variables.best_size:
+            best.clear()
+            best.update((lit >> 1, not lit & 1) for lit in stack)
+        update_phases(stack)
+
+    variables.update_phases = spy
+    solver.solve(conflicts=2000)
+    assert len(best) == variables.best_size > 0
+    for var, val in best.items():
+        assert variables.best_phase[var] == val
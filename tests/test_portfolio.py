@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+from collections import namedtuple
+from random import Random
+
+import pytest
+
+from mcSATan import portfolio
+from test_cnf import folder, tests, check_model
+
+Var = namedtuple('Var', 'name value')
+
+
+def test_ring():
+    rand = Random(0)
+    ring = portfolio.Ring(capacity=50)
+    cursor = 0
+    for _ in range(200):
+        written = [(rand.randrange(4), rand.randrange(10),
+                    [rand.randrange(100) for _ in range(rand.randrange(8))])
+                   for _ in range(rand.randrange(4))]
+        for sender, lbd, clause in written:
+            ring.write(sender, lbd, clause)
+        entries, cursor = ring.read(cursor)
+        if sum(3 + len(clause) for _, _, clause in written) <= 50:
+            assert entries == written
+        assert cursor == ring.head.value
+
+
+@pytest.mark.parametrize("name,ans", tests[:5])
+def test_portfolio(name, ans):
+    model, stats, config = portfolio.solve(str(folder / name), jobs=2)
+    assert (model is not False) == ans
+    if model:
+        check_model(folder / name, [Var('var%s' % (i + 1), value)
+                                    for i, value in enumerate(model)])
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='the workers must see the patched module')
+def test_dead_workers(monkeypatch):
+    path = str(folder / tests[0][0])
+    worker = portfolio.worker
+
+    def crash(id, *args):
+        if id == 0:
+            os._exit(3)
+        worker(id, *args)
+
+    monkeypatch.setattr(portfolio, 'worker', crash)
+    model, stats, config = portfolio.solve(path, jobs=2)
+    assert stats['portfolio_worker'] == 1
+    monkeypatch.setattr(portfolio, 'worker', lambda *args: os._exit(3))
+    with pytest.raises(RuntimeError, match='exited with code 3'):
+        portfolio.solve(path, jobs=2)
+
+
+def test_shared_paths(tmp_path):
+    with pytest.raises(ValueError):
+        portfolio.solve(str(folder / tests[0][0]),
+                        trace=str(tmp_path / 'trace'))
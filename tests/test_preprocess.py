@@ -0,0 +1,124 @@
+import io
+import itertools
+import random
+
+import pytest
+
+from mcSATan.parsers.DIMACS import parse_cnf
+from mcSATan.utils import generators
+
+
+def dimacs(lit):
+    return -(lit >> 1) - 1 if lit & 1 else (lit >> 1) + 1
+
+
+def preprocess(nvars, clauses, passes, frozen=()):
+    """
+    solver of the clauses (DIMACS) after the passes
+    and its clauses (DIMACS)
+    """
+    solver = parse_cnf(io.StringIO(generators.dimacs(nvars, clauses)),
+                       preprocess=passes)
+    solver.preprocess(frozen)
+    db = solver.clauses
+    return solver, sorted(sorted(map(dimacs, db.literals(cref)))
+                          for cref in db.crefs())
+
+
+def satisfies(values, clauses):
+    """
+    values is a literal -> value bytearray (see ClauseDB)
+    """
+    return all(any(values[2 * abs(lit) - 2 + (lit < 0)] == 2
+                   for lit in clause) for clause in clauses)
+
+
+def assignments(nvars):
+    for bits in itertools.product((0, 2), repeat=nvars):
+        values = bytearray()
+        for bit in bits:
+            values += bytes((bit, 2 - bit))
+        yield values
+
+
+def test_subsume():
+    solver, clauses = preprocess(
+        4, [[1, 2], [1, 2, 3], [2, 1, -4], [3, 4], [2, 1]], ('subsume',))
+    assert clauses == [[1, 2], [3, 4]]
+    assert solver.stats.nb_subsumed_clauses == 3
+
+
+def test_strengthen():
+    solver, clauses = preprocess(3, [[1, 2], [-1, 2, 3]], ('strengthen',))
+    assert clauses == [[1, 2], [2, 3]]
+    assert solver.stats.nb_strengthened_clauses == 1
+
+
+def test_units():
+    solver, clauses = preprocess(
+        4, [[1], [-1, 2], [1, 3], [-2, -3, 4]], ('units',))
+    assert clauses == [[-3, 4], [1], [2]]
+    assert solver.stats.nb_preprocess_units == 2
+    _, clauses = preprocess(2, [[1], [-1, 2], [-2]], ('units',))
+    assert [] in clauses
+
+
+def test_eliminate():
+    original = [[1, 2], [1, 3], [-1, 4], [2, 3, 4], [-2, -3, -4]]
+    solver, clauses = preprocess(4, original, ('eliminate',),
+                                 frozen={1, 2, 3})
+    # the resolvents on 1 replace its clauses
+    assert clauses == [[-4, -3, -2], [2, 3, 4], [2, 4], [3, 4]]
+    assert solver.preprocessor.eliminated_vars == {0}
+    assert 0 not in solver.variables.pq
+    assert solver.stats.nb_eliminated_vars == 1
+    # too many resolvents
+    solver, clauses = preprocess(
+        6, [[1, 2], [1, 3], [1, 4], [-1, 5], [-1, 6]], ('eliminate',),
+        frozen={1, 2, 3, 4, 5})
+    assert len(clauses) == 5
+    assert not solver.preprocessor.eliminated_vars
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_extend(seed):
+    """
+    extend turns every model of the preprocessed clauses
+    into a model of the original ones
+    """
+    rng = random.Random(seed)
+    nvars = 8
+    original = [[rng.choice((-1, 1)) * var
+                 for var in rng.sample(range(1, nvars + 1), rng.randint(1, 3))]
+                for _ in range(rng.randint(5, 25))]
+    solver, clauses = preprocess(nvars, original, ('units', 'subsume',
+                                                   'strengthen', 'eliminate'))
+    eliminated = solver.preprocessor.eliminated_vars
+    nb_models = 0
+    for values in assignments(nvars):
+        if any(values[2 * var] for var in eliminated):
+            # the values of the eliminated variables are computed
+            continue
+        if satisfies(values, clauses):
+            nb_models += 1
+            solver.preprocessor.extend(values)
+            assert satisfies(values, original)
+    # the preprocessing preserves the satisfiability
+    assert (nb_models > 0) == any(satisfies(values, original)
+                                  for values in assignments(nvars))
+
+
+def test_restore():
+    original = [[1, 2], [1, 3], [-1, 4], [2, 3, 4], [-2, -3, -4]]
+    solver, _ = preprocess(4, original, ('eliminate',), frozen={1, 2, 3})
+    var = solver.variables.by_index[0]
+    solver.Clause(solver.Literal(var, False))
+    assert not solver.preprocessor.eliminated_vars
+    assert 0 in solver.variables.pq
+    assert solver.stats.nb_restored_vars == 1
+    db = solver.clauses
+    clauses = [sorted(map(dimacs, db.literals(cref))) for cref in db.crefs()]
+    for clause in ([1, 2], [1, 3], [-1, 4], [-1]):
+        assert clause in clauses
+    model = solver.solve()
+    assert model and var.value is False
@@ -0,0 +1,53 @@
+from random import Random
+
+from mcSATan.core import SolverStats
+from mcSATan.types import BoolVar, VarDB
+from mcSATan.utils.priority_queue import PriorityQ
+
+
+def test_priority_queue():
+    rand = Random(0)
+    pq = PriorityQ()
+    ref = {}
+    for _ in range(2000):
+        elem = rand.randrange(50)
+        op = rand.random()
+        if op < .5:
+            ref[elem] = rand.random()
+            pq.push(elem, ref[elem])
+        elif op < .7:
+            ref.pop(elem, None)
+            pq.remove(elem)
+        elif ref:
+            ans = pq.pop()
+            assert ref.pop(ans) <= min(ref.values(), default=1)
+        assert len(pq) == len(ref) == len(set(pq))
+        assert all((e in pq) == (e in ref) for e in range(60))
+
+
+def test_assigned_variables():
+    """
+    the assigned variables stay in the heap of the VarDB
+    until they are at the top
+    """
+    variables = VarDB(SolverStats())
+    for i in range(10):
+        variables.add(BoolVar(i))
+    for index in range(10):
+        variables.activity[index] = index
+        variables.pq.push(index, variables.key(index))
+    for index in (9, 8, 5):
+        variables.assign(index)
+    assert len(variables.pq) == 10
+    assert variables.can_decide()
+    assert variables.pop() == 7
+    variables.desassign(9)
+    assert variables.pop() == 9
+    variables.assign(6)
+    assert variables.pop() == 4
+    for index in (8, 7, 5, 6):
+        variables.desassign(index)
+    assert [variables.pop() for _ in range(4)] == [8, 7, 6, 5]
+    for index in range(4):
+        variables.assign(index)
+    assert not variables.can_decide()
@@ -0,0 +1,242 @@
+from collections import Counter
+
+import pytest
+
+from mcSATan.parsers.DIMACS import parse_cnf
+from mcSATan.proof import Proof
+from mcSATan.utils import generators
+from test_cnf import folder
+
+
+def read_cnf(path):
+    ints = [int(x) for line in open(path)
+            if line.strip() and line.split()[0] not in 'cp%'
+            for x in line.split()]
+    clauses, clause = [], []
+    for x in ints:
+        if x:
+            clause.append(x)
+        else:
+            clauses.append(clause)
+            clause = []
+    return clauses
+
+
+def numbers(data, i):
+    """
+    variable-length unsigned ints until 0
+    """
+    ans = []
+    while True:
+        u = shift = 0
+        while data[i] & 128:
+            u |= (data[i] & 127) << shift
+            shift += 7
+            i += 1
+        u |= data[i] << shift
+        i += 1
+        if not u:
+            return ans, i
+        ans.append(u)
+
+
+def signed(u):
+    return -(u >> 1) if u & 1 else u >> 1
+
+
+def read_drat(path, binary):
+    """
+    yields ('a' | 'd', clause)
+    """
+    if binary:
+        data = open(path, 'rb').read()
+        i = 0
+        while i < len(data):
+            kind = chr(data[i])
+            lits, i = numbers(data, i + 1)
+            yield kind, list(map(signed, lits))
+    else:
+        for line in open(path):
+            words = line.split()
+            kind = 'd' if words[0] == 'd' else 'a'
+            yield kind, [int(x) for x in words[kind == 'd':-1]]
+
+
+def read_lrat(path, binary):
+    """
+    yields ('a', id, clause, hints) or ('d', ids)
+    """
+    if binary:
+        data = open(path, 'rb').read()
+        i = 0
+        while i < len(data):
+            kind = chr(data[i])
+            if kind == 'a':
+                # the id is not 0
+                lits, i = numbers(data, i + 1)
+                hints, i = numbers(data, i)
+                yield 'a', signed(lits[0]), list(map(signed, lits[1:])), list(
+                    map(signed, hints))
+            else:
+                ids, i = numbers(data, i + 1)
+                yield 'd', list(map(signed, ids))
+    else:
+        for line in open(path):
+            words = line.split()
+            if words[1] == 'd':
+                yield 'd', [int(x) for x in words[2:-1]]
+            else:
+                ints = [int(x) for x in words]
+                end = ints.index(0, 1)
+                yield 'a', ints[0], ints[1:end], ints[end + 1:-1]
+
+
+def propagate(clauses, true):
+    """
+    unit propagation of the set of true literals,
+    True if there is a conflict
+    """
+    changed = True
+    while changed:
+        changed = False
+        for clause in clauses:
+            if any(lit in true for lit in clause):
+                continue
+            free = [lit for lit in clause if -lit not in true]
+            if not free:
+                return True
+            if len(free) == 1:
+                true.add(free[0])
+                changed = True
+    return False
+
+
+def check_drat(cnf, path, binary=True):
+    """
+    forward check: every lemma must be RUP,
+    the deleted clauses must exist
+    """
+    formula = Counter(frozenset(clause) for clause in read_cnf(cnf))
+    empty = False
+    for kind, clause in read_drat(path, binary):
+        clause = frozenset(clause)
+        if kind == 'd':
+            assert formula[clause] > 0
+            formula[clause] -= 1
+            continue
+        assert propagate(+formula, {-lit for lit in clause}), clause
+        formula[clause] += 1
+        empty = empty or not clause
+    return empty
+
+
+def check_lrat(cnf, path, binary=True):
+    """
+    every lemma must be derived by unit propagation on its hints
+    """
+    formula = dict(enumerate(read_cnf(cnf), 1))
+    empty = False
+    for event in read_lrat(path, binary):
+        if event[0] == 'd':
+            for id in event[1]:
+                del formula[id]
+            continue
+        _, id, clause, hints = event
+        assert id > max(formula)
+        true = {-lit for lit in clause}
+        for i, hint in enumerate(hints):
+            free = [lit for lit in formula[hint] if -lit not in true]
+            if not free:
+                assert i == len(hints) - 1
+                break
+            assert len(free) == 1 and free[0] not in true
+            true.add(free[0])
+        else:
+            assert False, 'no conflict'
+        formula[id] = clause
+        empty = empty or not clause
+    return empty
+
+
+UNSAT = ['php32.cnf', 'php54.cnf', 'php76.cnf']
+
+
+@pytest.mark.parametrize('name', UNSAT)
+@pytest.mark.parametrize('options', [{}, {'reduce_interval': 20},
+                                     {'preprocess': ()}])
+def test_drat(tmp_path, name, options):
+    cnf = str(folder / name)
+    proof = str(tmp_path / 'proof.drat')
+    solver = parse_cnf(cnf, proof=proof, **options)
+    assert solver.solve() is False
+    solver.close()
+    assert check_drat(cnf, proof)
+    assert solver.stats.nb_proof_additions > 0
+
+
+def test_close(tmp_path):
+    """
+    the solver closes the proof it opened, not the one of the caller
+    """
+    cnf = str(folder / 'php32.cnf')
+    solver = parse_cnf(cnf, proof=str(tmp_path / 'proof.drat'))
+    solver.solve()
+    solver.close()
+    assert solver.proof.file.closed
+    solver.close()
+    proof = Proof(str(tmp_path / 'caller.drat'))
+    solver = parse_cnf(cnf, proof=proof)
+    solver.solve()
+    solver.close()
+    assert not proof.file.closed
+    proof.close()
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_drat_random(tmp_path, seed):
+    cnf = str(tmp_path / 'random.cnf')
+    with open(cnf, 'w') as f:
+        f.write(generators.dimacs(*generators.random_ksat(
+            30, ratio=5, seed=seed)))
+    proof = str(tmp_path / 'proof.drat')
+    solver = parse_cnf(cnf, proof=Proof(proof, binary=False, thread=True),
+                       reduce_interval=10)
+    model = solver.solve()
+    solver.proof.close()
+    assert check_drat(cnf, proof, binary=False) == (model is False)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_drat_cache(tmp_path, seed):
+    """
+    the clauses preloaded from a cache are lemmas
+    """
+    cnf = str(tmp_path / 'random.cnf')
+    with open(cnf, 'w') as f:
+        f.write(generators.dimacs(*generators.random_ksat(
+            40, ratio=5, seed=seed)))
+    cache = str(tmp_path / 'cache')
+    assert parse_cnf(cnf, cache=cache).solve() is False
+    proof = str(tmp_path / 'proof.drat')
+    solver = parse_cnf(cnf, cache=cache, proof=proof)
+    assert solver.solve() is False
+    assert solver.stats.nb_cached_clauses > 0
+    solver.close()
+    assert check_drat(cnf, proof)
+
+
+@pytest.mark.parametrize('name', UNSAT)
+@pytest.mark.parametrize('binary', [True, False])
+def test_lrat(tmp_path, name, binary):
+    cnf = str(folder / name)
+    proof = str(tmp_path / 'proof.lrat')
+    solver = parse_cnf(cnf, proof=Proof(proof, lrat=True, binary=binary),
+                       preprocess=(), reduce_interval=20)
+    assert solver.solve() is False
+    assert check_lrat(cnf, proof, binary)
+
+
+def test_lrat_preprocess(tmp_path):
+    with pytest.raises(ValueError):
+        parse_cnf(str(folder / 'php32.cnf'),
+                  proof=Proof(str(tmp_path / 'proof'), lrat=True))
@@ -0,0 +1,46 @@
+import json
+import pickle
+
+from mcSATan.core import SolverStats
+from mcSATan.parsers.DIMACS import parse_cnf
+from test_cnf import folder
+
+
+def test_stats():
+    stats = SolverStats()
+    assert stats.nb_conflicts == 0 and stats.nb_unknown == 0
+    stats.nb_unknown += 2
+    stats['time_other'] += .5
+    assert stats['nb_unknown'] == 2 and stats.time_other == .5
+    snapshot = dict(stats)
+    assert snapshot['nb_unknown'] == 2
+    assert snapshot['hist_learned_lbd'] == [0] * stats.HISTOGRAM_SIZE
+    assert set(stats.TIMES) <= set(snapshot)
+    copy = pickle.loads(pickle.dumps(stats))
+    assert dict(copy) == snapshot
+
+
+def test_search_stats():
+    reports = []
+    solver = parse_cnf(str(folder / 'php76.cnf'), progress=50,
+                       on_progress=lambda stats: reports.append(
+                           stats.nb_conflicts))
+    assert solver.solve() is False
+    stats = solver.stats
+    assert reports == list(range(50, stats.nb_conflicts + 1, 50))
+    # the last conflict is at level 0
+    learned = stats.nb_conflicts - 1
+    assert sum(stats.hist_learned_length) == learned
+    assert sum(stats.hist_learned_lbd) == learned
+    assert all(getattr(stats, key) > 0 for key in stats.TIMES)
+    assert '%d conflicts' % stats.nb_conflicts in stats.progress_line()
+    json.dumps(dict(stats))
+
+
+def test_forced_reductions():
+    # max_learned cannot be reached: most learned clauses are kept
+    solver = parse_cnf(str(folder / 'php76.cnf'), max_learned=0,
+                       reduce_inc=100)
+    assert solver.solve() is False
+    stats = solver.stats
+    assert 0 < stats.nb_reductions <= stats.nb_conflicts // 100 + 1
@@ -0,0 +1,55 @@
+import pytest
+
+from mcSATan import trace
+from mcSATan.core import Trail
+from mcSATan.parsers.DIMACS import parse_cnf
+from test_cnf import folder
+
+
+def test_release():
+    solver = parse_cnf(str(folder / 'php54.cnf'))
+    assert type(solver.trail) is Trail and solver.trace is None
+
+
+@pytest.mark.parametrize('name', ['php54.cnf', 'php77.cnf', 'php1414.cnf'])
+def test_trace(tmp_path, name):
+    path = str(tmp_path / 'search.trace')
+    solver = parse_cnf(str(folder / name), trace=path)
+    model = solver.solve()
+    events = list(trace.read(path))
+    assert events[0][0] == trace.SOLVE
+    event, args = events[-1]
+    assert event == trace.RESULT
+    assert list(args) == [trace.UNSAT if model is False else trace.SAT]
+    replay = trace.Replay()
+    for i, (event, args) in enumerate(events):
+        if event == trace.BACKTRACK and events[i + 1][0] == trace.RESULT:
+            # the trail before the final backtrack
+            assigned = {lit >> 1: lit for lit, _, _ in replay.stack}
+            assert len(assigned) == len(replay.stack)
+            if model:
+                # the eliminated variables are not on the trail
+                values = solver.variables.by_index
+                assert all(values[var].value == (not lit & 1)
+                           for var, lit in assigned.items())
+        replay.apply(event, args)
+        assert replay.level == len(replay.lim)
+        assert trace.describe(event, args).startswith(trace.EVENTS[event])
+    assert replay.level == 0
+    assert replay.conflicts == solver.stats.nb_conflicts
+
+
+def test_main(tmp_path, capsys):
+    path = str(tmp_path / 'search.trace')
+    assert parse_cnf(str(folder / 'php54.cnf'), trace=path).solve() is False
+    trace.main([path])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-1].split() == ['0', 'RESULT', 'UNSAT']
+    trace.main([path, '--at', '2'])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-1].startswith('CONFLICT #')
+    assert lines[0].split()[-1] == 'decision'
+    with open(path, 'r+b') as f:
+        f.write(b'x')
+    with pytest.raises(ValueError):
+        list(trace.read(path))